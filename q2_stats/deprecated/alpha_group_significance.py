@@ -10,6 +10,8 @@ import pandas as pd
 
 import qiime2
 
+from q2_stats.util import categorize_columns
+
 
 def alpha_group_significance(ctx, alpha_diversity, metadata, columns,
                              subject='', timepoint=''):
@@ -54,6 +56,7 @@ def prep_alpha_distribution(alpha_diversity: pd.Series,
         dist['group'] = md_df[timepoint]
 
     dist = dist.reset_index(names='id')
+    dist = categorize_columns(dist)
 
     dist['measure'].attrs.update({
         'title': alpha_diversity.name or 'alpha-diversity'
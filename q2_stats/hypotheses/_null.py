@@ -0,0 +1,147 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2024, QIIME 2 development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import os
+import collections
+import threading
+
+import numpy as np
+import scipy.special
+
+
+CacheInfo = collections.namedtuple(
+    'CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class NullDistributionCache:
+    """
+    Process-wide LRU cache of exact null distributions.
+
+    Entries are keyed by the sample sizes that define the distribution and
+    hold its survival function (``sf[k] == P(X >= k)``), so a p-value is a
+    single array lookup. When `directory` is set, computed distributions are
+    also persisted there as ``.npy`` files and reused by later processes.
+    `hits` and `misses` count in-memory lookups, see `cache_info`.
+    """
+
+    def __init__(self, name, compute, maxsize=256, directory=None):
+        self.name = name
+        self.compute = compute
+        self.maxsize = maxsize
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+
+        sf = self._load(key)
+        if sf is None:
+            sf = self.compute(*key)
+            self._save(key, sf)
+
+        with self._lock:
+            self._entries[key] = sf
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+        return sf
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize,
+                         len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _path(self, key):
+        name = '-'.join([self.name, *map(str, key)])
+        return os.path.join(self.directory, f'{name}.npy')
+
+    def _load(self, key):
+        if self.directory is None:
+            return None
+
+        try:
+            return np.load(self._path(key))
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, key, sf):
+        if self.directory is None:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as fh:
+            np.save(fh, sf)
+        os.replace(tmp, path)
+
+
+def _mannwhitneyu_sf(n1, n2):
+    # The number of arrangements with U == u is the coefficient of q**u in
+    # the Gaussian binomial [n1 + n2 choose n1]_q, which is built up as
+    # prod_i (1 - q**(n2 + i)) / (1 - q**i). Counts are kept exact (int64
+    # when they fit, Python ints otherwise) and only normalized at the end.
+    total = scipy.special.comb(n1 + n2, n1, exact=True)
+    dtype = np.int64 if total < 2 ** 62 else object
+
+    size = n1 * n2 + 1
+    freqs = np.zeros(size, dtype=dtype)
+    freqs[0] = 1
+    for i in range(1, n1 + 1):
+        shift = n2 + i
+        freqs[shift:] = freqs[shift:] - freqs[:-shift]
+        # dividing by (1 - q**i) is a running sum with stride i
+        blocks = np.zeros(-(-size // i) * i, dtype=dtype)
+        blocks[:size] = freqs
+        freqs = np.cumsum(blocks.reshape(-1, i), axis=0).ravel()[:size]
+
+    sf = np.cumsum(freqs[::-1])[::-1]
+    return np.asarray(sf / total, dtype=float)
+
+
+def _wilcoxon_sf(n):
+    # The number of sign assignments with T+ == t is the coefficient of q**t
+    # in prod_i (1 + q**i); halving at every step keeps this a pmf.
+    pmf = np.ones(1)
+    for i in range(1, n + 1):
+        prev = pmf
+        pmf = np.zeros(i * (i + 1) // 2 + 1)
+        pmf[:len(prev)] = prev * 0.5
+        pmf[-len(prev):] += prev * 0.5
+
+    return np.cumsum(pmf[::-1])[::-1]
+
+
+MANN_WHITNEY_U_NULL = NullDistributionCache(
+    'mannwhitneyu', _mannwhitneyu_sf,
+    directory=os.environ.get('Q2_STATS_NULL_CACHE_DIR'))
+
+WILCOXON_T_NULL = NullDistributionCache(
+    'wilcoxon', _wilcoxon_sf,
+    directory=os.environ.get('Q2_STATS_NULL_CACHE_DIR'))
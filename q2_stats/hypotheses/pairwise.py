@@ -7,9 +7,13 @@
 # ----------------------------------------------------------------------------
 
 import itertools
+import warnings
+import numpy as np
 import pandas as pd
+import scipy.special
 import scipy.stats
 
+from q2_stats.hypotheses._null import MANN_WHITNEY_U_NULL, WILCOXON_T_NULL
 from q2_stats.hypotheses._util import set_pairwise_attrs
 from q2_stats.meta import fdr_benjamini_hochberg
 
@@ -18,7 +22,8 @@ def mann_whitney_u(distribution: pd.DataFrame, compare: str,
                    reference_group: str = None,
                    against_each: pd.DataFrame = None,
                    alternative: str = 'two-sided',
-                   p_val_approx: str = 'auto') -> pd.DataFrame:
+                   p_val_approx: str = 'auto',
+                   engine: str = 'scipy') -> pd.DataFrame:
 
     dists = [distribution]
 
@@ -42,25 +47,32 @@ def mann_whitney_u(distribution: pd.DataFrame, compare: str,
                          " or `all-pairwise` as your comparison.")
 
     _alternative_comps(alternative=alternative)
+    _engine_comps(engine=engine)
 
-    table = []
-    for (idx_a, comp_a), (idx_b, comp_b) in comparisons:
-        a_dist = dists[idx_a]
-        b_dist = dists[idx_b]
+    indices = [_index_groups(dist) for dist in dists]
+    comparisons = list(comparisons)
 
-        group_a = a_dist[a_dist['group'] == comp_a]['measure']
-        group_b = b_dist[b_dist['group'] == comp_b]['measure']
+    if not comparisons:
+        raise ValueError('Not enough groups to compare.')
 
-        row = _compare_mannwhitneyu(group_a, group_b,
-                                    alternative, p_val_approx)
-        row['A:group'] = comp_a
-        row['B:group'] = comp_b
-        table.append(row)
+    if engine == 'batched':
+        df = _batched_mannwhitneyu(indices, comparisons,
+                                   alternative, p_val_approx)
+    else:
+        table = []
+        for (idx_a, comp_a), (idx_b, comp_b) in comparisons:
+            group_a = indices[idx_a].get(comp_a, _EMPTY_GROUP)
+            group_b = indices[idx_b].get(comp_b, _EMPTY_GROUP)
 
-    if not table:
-        raise ValueError('Not enough groups to compare.')
+            row = _compare_mannwhitneyu(group_a, group_b,
+                                        alternative, p_val_approx)
+            row['A:group'] = comp_a
+            row['B:group'] = comp_b
+            table.append(row)
 
-    df = pd.DataFrame(table)
+        df = pd.DataFrame(table)
+
+    (idx_a, _), (idx_b, _) = comparisons[-1]
     df = fdr_benjamini_hochberg(df)
     df = _set_attrs_mannwhitneyu(df, dists[idx_a], dists[idx_b],
                                  alternative, p_val_approx)
@@ -93,22 +105,197 @@ def _comp_all_pairwise(distribution, against_each=None):
             yield ((0, comp_a), (1, comp_b))
 
 
+_EMPTY_GROUP = np.empty(0, dtype=float)
+
+
+def _index_groups(distribution):
+    """
+    Partition the `measure` column by `group` in a single pass.
+
+    Returns a dict of group -> contiguous array of that group's measures, so
+    that each comparison can reuse the slices instead of re-scanning the
+    whole distribution with a boolean mask.
+    """
+    codes, uniques = pd.factorize(distribution['group'])
+    order = np.argsort(codes, kind='stable')
+    measure = distribution['measure'].to_numpy()[order]
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+
+    return {group: measure[start:stop]
+            for group, start, stop in zip(uniques, bounds[:-1], bounds[1:])}
+
+
 def _compare_mannwhitneyu(group_a, group_b, alternative, p_val_approx):
-    stat, p_val = scipy.stats.mannwhitneyu(
-        group_a, group_b, method=p_val_approx,
-        alternative=alternative, nan_policy='raise')
+    if _use_exact_mannwhitneyu(group_a, group_b, p_val_approx):
+        stat = _mannwhitneyu_statistic(group_a, group_b)
+        p_val = _mannwhitneyu_exact(stat, len(group_a), len(group_b),
+                                    alternative)
+    else:
+        stat, p_val = scipy.stats.mannwhitneyu(
+            group_a, group_b, method=p_val_approx,
+            alternative=alternative, nan_policy='raise')
 
     return {
         'A:n': len(group_a),
         'B:n': len(group_b),
-        'A:measure': group_a.median(),
-        'B:measure': group_b.median(),
+        'A:measure': np.median(group_a),
+        'B:measure': np.median(group_b),
         'n': len(group_a) + len(group_b),
         'test-statistic': stat,
         'p-value': p_val
     }
 
 
+def _batched_mannwhitneyu(indices, comparisons, alternative, p_val_approx):
+    """
+    Compute every comparison at once from per-group sorted measures.
+
+    Each group is sorted a single time. For every distinct Group B, the
+    Group A observations are located in B's sorted measures with
+    `searchsorted`, which yields both the U statistic (the count of B below
+    each A observation plus half the ties) and the cross-group tie counts
+    needed by the asymptotic tie correction. Summing those per Group A with
+    `reduceat` fills in a whole column of the all-pairs U matrix at once.
+    Comparisons that require the exact null distribution look their
+    p-values up in the shared exact null cache.
+    """
+    keys_a = list(dict.fromkeys(a for a, _ in comparisons))
+    keys_b = list(dict.fromkeys(b for _, b in comparisons))
+    sorted_ = {key: np.sort(indices[key[0]].get(key[1], _EMPTY_GROUP))
+               for key in keys_a + keys_b}
+
+    if any(np.isnan(measures).any() for measures in sorted_.values()):
+        raise ValueError('The input contains nan values')
+
+    # checked before the groups are concatenated, as `reduceat` cannot
+    # sum an empty last group
+    n1 = np.array([len(sorted_[a]) for a, _ in comparisons])
+    n2 = np.array([len(sorted_[b]) for _, b in comparisons])
+    if (n1 == 0).any() or (n2 == 0).any():
+        # as scipy.stats.mannwhitneyu rejects it
+        raise ValueError('`x` and `y` must be of nonzero size.')
+
+    ties = {key: _tie_counts(measures) for key, measures in sorted_.items()}
+    tie_term = {key: np.sum(t.astype(float) ** 2 - 1)
+                for key, t in ties.items()}
+
+    a_values = np.concatenate([sorted_[key] for key in keys_a])
+    a_ties = np.concatenate([ties[key] for key in keys_a])
+    a_starts = np.cumsum([0] + [len(sorted_[key]) for key in keys_a[:-1]])
+
+    u_matrix = np.empty((len(keys_a), len(keys_b)))
+    cross_matrix = np.empty((len(keys_a), len(keys_b)))
+    for col, key_b in enumerate(keys_b):
+        lower = np.searchsorted(sorted_[key_b], a_values, side='left')
+        equal = np.searchsorted(sorted_[key_b], a_values,
+                                side='right') - lower
+
+        u_matrix[:, col] = np.add.reduceat(lower + 0.5 * equal, a_starts)
+        cross_matrix[:, col] = np.add.reduceat(
+            3.0 * (a_ties * equal + equal.astype(float) ** 2), a_starts)
+
+    pos_a = {key: i for i, key in enumerate(keys_a)}
+    pos_b = {key: i for i, key in enumerate(keys_b)}
+    rows = np.array([pos_a[a] for a, _ in comparisons])
+    cols = np.array([pos_b[b] for _, b in comparisons])
+
+    u1 = u_matrix[rows, cols]
+    tie_sum = (np.array([tie_term[a] for a, _ in comparisons])
+               + np.array([tie_term[b] for _, b in comparisons])
+               + cross_matrix[rows, cols])
+
+    p_val = _mannwhitneyu_asymptotic(u1, n1, n2, tie_sum, alternative)
+
+    if p_val_approx == 'exact':
+        exact = np.ones(len(comparisons), dtype=bool)
+    elif p_val_approx == 'auto':
+        exact = ((n1 <= 8) | (n2 <= 8)) & (tie_sum == 0)
+    else:
+        exact = np.zeros(len(comparisons), dtype=bool)
+
+    for i in np.flatnonzero(exact):
+        p_val[i] = _mannwhitneyu_exact(u1[i], n1[i], n2[i], alternative)
+
+    return pd.DataFrame({
+        'A:n': n1,
+        'B:n': n2,
+        'A:measure': [_sorted_median(sorted_[a]) for a, _ in comparisons],
+        'B:measure': [_sorted_median(sorted_[b]) for _, b in comparisons],
+        'n': n1 + n2,
+        'test-statistic': u1,
+        'p-value': p_val,
+        'A:group': [a for (_, a), _ in comparisons],
+        'B:group': [b for _, (_, b) in comparisons],
+    })
+
+
+def _use_exact_mannwhitneyu(group_a, group_b, p_val_approx):
+    # Same selection rule as scipy.stats.mannwhitneyu. Inputs with NaNs are
+    # left to scipy, which rejects them.
+    if p_val_approx == 'asymptotic':
+        return False
+
+    measures = np.concatenate([group_a, group_b])
+    if len(group_a) == 0 or len(group_b) == 0 or np.isnan(measures).any():
+        return False
+    if p_val_approx == 'exact':
+        return True
+
+    return ((len(group_a) <= 8 or len(group_b) <= 8)
+            and len(np.unique(measures)) == len(measures))
+
+
+def _mannwhitneyu_statistic(group_a, group_b):
+    sorted_b = np.sort(group_b)
+    lower = np.searchsorted(sorted_b, group_a, side='left')
+    upper = np.searchsorted(sorted_b, group_a, side='right')
+
+    return float(np.sum(lower + 0.5 * (upper - lower)))
+
+
+def _mannwhitneyu_exact(u1, n1, n2, alternative):
+    sf = MANN_WHITNEY_U_NULL.get((min(n1, n2), max(n1, n2)))
+    u2 = n1 * n2 - u1
+
+    if alternative == 'greater':
+        return sf[int(u1)]
+    elif alternative == 'less':
+        return sf[int(u2)]
+    else:
+        return min(2 * sf[int(max(u1, u2))], 1.0)
+
+
+def _mannwhitneyu_asymptotic(u1, n1, n2, tie_sum, alternative):
+    # Mirrors the normal approximation (with continuity correction) used by
+    # scipy.stats.mannwhitneyu, but over an array of comparisons.
+    if alternative == 'greater':
+        u, factor = u1, 1
+    elif alternative == 'less':
+        u, factor = n1 * n2 - u1, 1
+    else:
+        u, factor = np.maximum(u1, n1 * n2 - u1), 2
+
+    n = n1 + n2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_sum / (n * (n - 1))))
+        z = (u - n1 * n2 / 2 - 0.5) / sigma
+
+    return np.clip(scipy.special.ndtr(-z) * factor, 0, 1)
+
+
+def _tie_counts(sorted_measures):
+    # for each observation, the number of observations sharing its value
+    return (np.searchsorted(sorted_measures, sorted_measures, side='right')
+            - np.searchsorted(sorted_measures, sorted_measures, side='left'))
+
+
+def _sorted_median(sorted_measures):
+    n = len(sorted_measures)
+    if n == 0:
+        return float('nan')
+    return (sorted_measures[(n - 1) // 2] + sorted_measures[n // 2]) / 2
+
+
 def _set_attrs_mannwhitneyu(df, group_a, group_b, alternative, p_val_approx):
     if p_val_approx == 'auto':
         null_desc = (
@@ -134,7 +321,8 @@ def wilcoxon_srt(distribution: pd.DataFrame, compare: str,
                  baseline_group: str = None,
                  alternative: str = 'two-sided',
                  p_val_approx: str = 'auto',
-                 ignore_empty_comparator: bool = False) -> pd.DataFrame:
+                 ignore_empty_comparator: bool = False,
+                 engine: str = 'scipy') -> pd.DataFrame:
 
     if compare == 'baseline':
         comparisons = _comp_baseline(distribution, baseline_group)
@@ -151,28 +339,33 @@ def wilcoxon_srt(distribution: pd.DataFrame, compare: str,
                          " or `consecutive` as your comparison.")
 
     _alternative_comps(alternative=alternative)
+    _engine_comps(engine=engine)
 
-    table = []
-    for comp_a, comp_b in comparisons:
-        group_a = distribution[distribution['group'] == comp_a]
-        group_b = distribution[distribution['group'] == comp_b]
+    matrix = _SubjectMatrix(distribution)
+    comparisons = list(comparisons)
 
-        group_a = group_a.set_index('subject')['measure']
-        group_a.index.name = comp_a
-        group_b = group_b.set_index('subject')['measure']
-        group_b.index.name = comp_b
+    if not comparisons:
+        raise ValueError('Not enough groups to compare.')
 
-        row = _compare_wilcoxon(group_a, group_b, alternative, p_val_approx,
-                                ignore_empty_comparator)
+    if engine == 'batched':
+        df = _batched_wilcoxon(matrix, comparisons, alternative,
+                               p_val_approx, ignore_empty_comparator)
+    else:
+        table = []
+        for comp_a, comp_b in comparisons:
+            group_a = matrix.column(comp_a)
+            group_b = matrix.column(comp_b)
 
-        row['A:group'] = comp_a
-        row['B:group'] = comp_b
-        table.append(row)
+            row = _compare_wilcoxon(group_a, group_b, alternative,
+                                    p_val_approx, ignore_empty_comparator,
+                                    pairs=matrix.pairs(comp_a, comp_b))
 
-    if not table:
-        raise ValueError('Not enough groups to compare.')
+            row['A:group'] = comp_a
+            row['B:group'] = comp_b
+            table.append(row)
+
+        df = pd.DataFrame(table)
 
-    df = pd.DataFrame(table)
     df = fdr_benjamini_hochberg(df)
     df = _set_attrs_wilcoxon(
         df, distribution, alternative, p_val_approx)
@@ -195,26 +388,79 @@ def _comp_consecutive(distribution):
     yield from zip(timepoints, timepoints[1:])
 
 
+class _SubjectMatrix:
+    """
+    Subject x group view of a matched distribution.
+
+    The distribution is pivoted once into a dense matrix of measures along
+    with a mask of which (subject, group) cells were observed, so paired
+    columns can be read for any comparison without re-filtering or joining.
+    Rows without a group are left out, and any group the matrix does not
+    hold (such as a missing one) reads as an empty column.
+    """
+
+    def __init__(self, distribution):
+        subject_codes, self.subjects = pd.factorize(
+            distribution['subject'], use_na_sentinel=False)
+        group_codes, groups = pd.factorize(distribution['group'])
+        self.columns = {group: idx for idx, group in enumerate(groups)}
+
+        # the last column is never filled and stands in for other groups
+        shape = (len(self.subjects), len(groups) + 1)
+        self.measures = np.full(shape, np.nan)
+        self.present = np.zeros(shape, dtype=bool)
+
+        grouped = group_codes >= 0
+        subject_codes = subject_codes[grouped]
+        group_codes = group_codes[grouped]
+        self.measures[subject_codes, group_codes] = (
+            distribution['measure'].to_numpy()[grouped])
+        self.present[subject_codes, group_codes] = True
+
+    def index(self, group):
+        return self.columns.get(group, len(self.columns))
+
+    def column(self, group):
+        idx = self.index(group)
+        present = self.present[:, idx]
+
+        series = pd.Series(self.measures[present, idx],
+                           index=self.subjects[present], name='measure')
+        series.index.name = group
+        return series
+
+    def pairs(self, group_a, group_b):
+        measures_a = self.measures[:, self.index(group_a)]
+        measures_b = self.measures[:, self.index(group_b)]
+        paired = ~np.isnan(measures_a) & ~np.isnan(measures_b)
+
+        return measures_a[paired], measures_b[paired]
+
+
 def _compare_wilcoxon(group_a, group_b, alternative, p_val_approx,
-                      ignore_empty_comparator) -> dict:
+                      ignore_empty_comparator, pairs=None) -> dict:
     if p_val_approx == 'asymptotic':
         # wilcoxon differs from mannwhitneyu in arg value, but does the same
         # test using a normal dist instead of the permutational dist so
         # normalize the naming in Q2
         p_val_approx = 'approx'
-    comp = pd.merge(group_a.to_frame(), group_b.to_frame(), how='outer',
-                    left_index=True, right_index=True)
-    filtered = comp.dropna()
+
+    if pairs is None:
+        comp = pd.merge(group_a.to_frame(), group_b.to_frame(), how='outer',
+                        left_index=True, right_index=True)
+        filtered = comp.dropna()
+        pairs = filtered.iloc[:, 0], filtered.iloc[:, 1]
+    paired_a, paired_b = pairs
 
     results = {
         'A:n': len(group_a),
         'B:n': len(group_b),
         'A:measure': group_a.median(),
         'B:measure': group_b.median(),
-        'n': len(filtered.index),
+        'n': len(paired_a),
     }
 
-    if filtered.empty:
+    if len(paired_a) == 0:
         if ignore_empty_comparator:
             stat = float('nan')
             p_val = float('nan')
@@ -229,9 +475,11 @@ def _compare_wilcoxon(group_a, group_b, alternative, p_val_approx,
                                                 list(group_a.index),
                                                 group_b.index.name,
                                                 list(group_b.index)))
+    elif _use_exact_wilcoxon(paired_a, paired_b, p_val_approx):
+        stat, p_val = _wilcoxon_exact(paired_a, paired_b, alternative)
     else:
         stat, p_val = scipy.stats.wilcoxon(
-            filtered.iloc[:, 0], filtered.iloc[:, 1],
+            paired_a, paired_b,
             nan_policy='raise', mode=p_val_approx, alternative=alternative)
 
     results['test-statistic'] = stat
@@ -240,6 +488,148 @@ def _compare_wilcoxon(group_a, group_b, alternative, p_val_approx,
     return results
 
 
+def _batched_wilcoxon(matrix, comparisons, alternative, p_val_approx,
+                      ignore_empty_comparator):
+    """
+    Compute every comparison at once from a subject x group matrix.
+
+    The paired differences of all comparisons form one subjects x
+    comparisons array (NaN where a subject is missing from either group).
+    Zero differences are dropped, as with scipy's default "wilcox" zero
+    method, and the absolute differences are ranked column-wise in a single
+    pass. Both the signed-rank sums and the tie-corrected normal
+    approximation then reduce to column sums.
+
+    Only comparisons that scipy would also evaluate with the normal
+    approximation (``"asymptotic"``, or ``"auto"`` with more than 50 pairs)
+    are computed this way. Exact comparisons without ties or zeros read
+    their p-values from the shared exact null cache; the rest, including
+    comparisons without any paired subjects, go through `_compare_wilcoxon`.
+    """
+    cols_a = np.array([matrix.index(a) for a, _ in comparisons])
+    cols_b = np.array([matrix.index(b) for _, b in comparisons])
+
+    diffs = matrix.measures[:, cols_a] - matrix.measures[:, cols_b]
+    paired = ~np.isnan(diffs)
+    nonzero = paired & (diffs != 0)
+
+    n = paired.sum(axis=0)
+    count = nonzero.sum(axis=0)
+
+    # Dropped observations are ranked as ties above every real difference
+    # so they do not disturb the ranks of the remaining ones.
+    abs_diffs = np.where(nonzero, np.abs(diffs), np.inf)
+    low = scipy.stats.rankdata(abs_diffs, method='min', axis=0)
+    high = scipy.stats.rankdata(abs_diffs, method='max', axis=0)
+    ranks = np.where(nonzero, (low + high) / 2, 0)
+    ties = np.where(nonzero, high - low + 1, 1)
+
+    r_plus = np.sum(ranks * (diffs > 0), axis=0)
+    r_minus = np.sum(ranks * (diffs < 0), axis=0)
+
+    mean = count * (count + 1) * 0.25
+    var = (count * (count + 1) * (2 * count + 1)
+           - 0.5 * np.sum(ties.astype(float) ** 2 - 1, axis=0)) / 24
+
+    if alternative == 'two-sided':
+        stat = np.minimum(r_plus, r_minus)
+    else:
+        stat = r_plus
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (stat - mean) / np.sqrt(var)
+
+    if alternative == 'two-sided':
+        p_val = 2 * scipy.special.ndtr(-np.abs(z))
+    elif alternative == 'greater':
+        p_val = scipy.special.ndtr(-z)
+    else:
+        p_val = scipy.special.ndtr(z)
+
+    if p_val_approx == 'asymptotic':
+        vectorized = count > 0
+        exact = np.zeros(len(comparisons), dtype=bool)
+    else:
+        if p_val_approx == 'auto':
+            vectorized = (count > 0) & (n > 50)
+        else:
+            vectorized = np.zeros(len(comparisons), dtype=bool)
+        exact = ~vectorized & (n > 0) & (count == n) & np.all(ties == 1,
+                                                              axis=0)
+
+    for i in np.flatnonzero(exact):
+        p_val[i] = _wilcoxon_exact_pvalue(int(r_plus[i]), int(n[i]),
+                                          alternative)
+
+    for i in np.flatnonzero(~vectorized & ~exact):
+        comp_a, comp_b = comparisons[i]
+        row = _compare_wilcoxon(matrix.column(comp_a), matrix.column(comp_b),
+                                alternative, p_val_approx,
+                                ignore_empty_comparator,
+                                pairs=matrix.pairs(comp_a, comp_b))
+        stat[i] = row['test-statistic']
+        p_val[i] = row['p-value']
+
+    group_n = matrix.present.sum(axis=0)
+    with warnings.catch_warnings():
+        # groups without any measures have a NaN median, as in pandas
+        warnings.simplefilter('ignore', RuntimeWarning)
+        group_median = np.nanmedian(matrix.measures, axis=0)
+
+    return pd.DataFrame({
+        'A:n': group_n[cols_a],
+        'B:n': group_n[cols_b],
+        'A:measure': group_median[cols_a],
+        'B:measure': group_median[cols_b],
+        'n': n,
+        'test-statistic': stat,
+        'p-value': p_val,
+        'A:group': [a for a, _ in comparisons],
+        'B:group': [b for _, b in comparisons],
+    })
+
+
+def _use_exact_wilcoxon(paired_a, paired_b, p_val_approx):
+    # The exact signed-rank distribution only applies without zero
+    # differences or tied ranks; every other case is left to scipy, whose
+    # handling of it differs between releases.
+    if p_val_approx == 'approx':
+        return False
+
+    diffs = np.abs(np.asarray(paired_a) - np.asarray(paired_b))
+    if np.isnan(diffs).any() or (diffs == 0).any():
+        return False
+    if p_val_approx == 'auto' and len(diffs) > 50:
+        return False
+
+    return len(np.unique(diffs)) == len(diffs)
+
+
+def _wilcoxon_exact(paired_a, paired_b, alternative):
+    diffs = np.asarray(paired_a) - np.asarray(paired_b)
+    ranks = scipy.stats.rankdata(np.abs(diffs))
+    r_plus = int(np.sum(ranks[diffs > 0]))
+
+    n = len(diffs)
+    p_val = _wilcoxon_exact_pvalue(r_plus, n, alternative)
+    if alternative == 'two-sided':
+        return float(min(r_plus, n * (n + 1) // 2 - r_plus)), p_val
+    return float(r_plus), p_val
+
+
+def _wilcoxon_exact_pvalue(r_plus, n, alternative):
+    # The null distribution is symmetric, so P(T <= t) == P(T >= max - t).
+    sf = WILCOXON_T_NULL.get((n,))
+    r_minus = n * (n + 1) // 2 - r_plus
+
+    if alternative == 'greater':
+        return sf[r_plus]
+    elif alternative == 'less':
+        return sf[r_minus]
+    else:
+        return min(2 * min(sf[r_plus], sf[r_minus]), 1.0)
+
+
 def _set_attrs_wilcoxon(df, group, alternative, p_val_approx):
     if p_val_approx == 'auto':
         null_desc = (
@@ -269,6 +659,12 @@ def _alternative_comps(alternative):
                          " or `less` as your alternative hypothesis.")
 
 
+def _engine_comps(engine):
+    if engine not in ('scipy', 'batched'):
+        raise ValueError("Invalid `engine` selected. Please either choose"
+                         " `scipy` or `batched` as your engine.")
+
+
 def _get_reference_from_column(series, reference_value, param_name):
     if reference_value is None:
         raise ValueError("%s must be provided." % param_name)
@@ -6,8 +6,32 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import functools
+import concurrent.futures
+
+import pandas as pd
+
+from q2_stats.hypotheses.pairwise import mann_whitney_u as _mann_whitney_u
+from q2_stats.hypotheses.pairwise import wilcoxon_srt as _wilcoxon_srt
+from q2_stats.meta.facet import (
+    lazy_facet_within as _facet_within, lazy_facet_across as _facet_across,
+    collate_stats_df as _collate_stats)
+from q2_stats.util import table_jsonl_field, n_workers as _n_workers
+
+
+def mann_whitney_u_facet(ctx, distribution, facet='within', fused=False,
+                         n_jobs=1):
+    if facet not in ('within', 'across'):
+        raise ValueError('`facet` should be "within" or "across"')
+    _check_n_jobs(fused, n_jobs)
+
+    if fused:
+        facet_dist = _facet_within if facet == 'within' else _facet_across
+        stats = _fused_facet_stats(
+            distribution.view(pd.DataFrame), facet_dist, _mann_whitney_u,
+            n_jobs=n_jobs, compare='all-pairwise')
+        return ctx.make_artifact('StatsTable[Pairwise]', stats)
 
-def mann_whitney_u_facet(ctx, distribution, facet='within'):
     mann_whitney_u = ctx.get_action('stats', 'mann_whitney_u')
     facet_within = ctx.get_action('stats', 'facet_within')
     facet_across = ctx.get_action('stats', 'facet_across')
@@ -15,10 +39,8 @@ def mann_whitney_u_facet(ctx, distribution, facet='within'):
 
     if facet == 'within':
         dists, = facet_within(distribution)
-    elif facet == 'across':
-        dists, = facet_across(distribution)
     else:
-        raise ValueError('`facet` should be "within" or "across"')
+        dists, = facet_across(distribution)
 
     stats = {}
     for key, dist in dists.items():
@@ -28,7 +50,17 @@ def mann_whitney_u_facet(ctx, distribution, facet='within'):
     return stats
 
 
-def wilcoxon_srt_facet(ctx, distribution, ignore_empty_comparator=True):
+def wilcoxon_srt_facet(ctx, distribution, ignore_empty_comparator=True,
+                       fused=False, n_jobs=1):
+    _check_n_jobs(fused, n_jobs)
+
+    if fused:
+        stats = _fused_facet_stats(
+            distribution.view(pd.DataFrame), _facet_across, _wilcoxon_srt,
+            n_jobs=n_jobs, compare='consecutive',
+            ignore_empty_comparator=ignore_empty_comparator)
+        return ctx.make_artifact('StatsTable[Pairwise]', stats)
+
     wilcoxon_srt = ctx.get_action('stats', 'wilcoxon_srt')
     facet_across = ctx.get_action('stats', 'facet_across')
     collate_stats = ctx.get_action('stats', 'collate_stats')
@@ -43,3 +75,74 @@ def wilcoxon_srt_facet(ctx, distribution, ignore_empty_comparator=True):
 
     stats, = collate_stats(stats)
     return stats
+
+
+def _check_n_jobs(fused, n_jobs):
+    # the unfused pipeline runs each facet as its own action, which only
+    # QIIME 2's parallel execution can spread over workers
+    if not fused and n_jobs != 1:
+        raise ValueError('`n_jobs` can only be set together with `fused`.'
+                         ' Use QIIME 2\'s parallel execution to test the'
+                         ' facets of the unfused pipeline concurrently.')
+
+
+def _fused_facet_stats(distribution, facet, test, n_jobs=1, **test_params):
+    """
+    Facet, test and collate `distribution` in memory.
+
+    This is the same chain of functions the facet actions wrap, but the
+    facets and per-facet tables are passed along as DataFrames instead of
+    being written out and read back as artifacts. With `n_jobs` other than
+    1 the facets are tested across a pool of worker processes; the
+    collated table keeps the facet order either way.
+    """
+    facets = facet(distribution)
+    run = functools.partial(_facet_stats, test=test, test_params=test_params)
+
+    max_workers = _n_workers(n_jobs, len(facets))
+    if max_workers == 1:
+        stats = {key: run(dist) for key, dist in facets.items()}
+    else:
+        # pickling a DataFrame drops the attrs of its columns, so they are
+        # shipped alongside the data and restored on the other side
+        with concurrent.futures.ProcessPoolExecutor(max_workers) as pool:
+            results = pool.map(
+                _run_packed, [(run, _pack(dist)) for dist in facets.values()])
+            stats = {key: _unpack(packed)
+                     for key, packed in zip(facets, results)}
+
+    return _collate_stats(stats)
+
+
+def _facet_stats(dist, test, test_params):
+    return _as_stored(test(_as_stored(dist), **test_params))
+
+
+def _pack(df):
+    return df, {name: df[name].attrs for name in df.columns}
+
+
+def _unpack(packed):
+    df, column_attrs = packed
+    for name, attrs in column_attrs.items():
+        df[name].attrs = attrs
+
+    return df
+
+
+def _run_packed(args):
+    run, packed = args
+    return _pack(run(_unpack(packed)))
+
+
+def _as_stored(df):
+    # Normalize column and table metadata to what a table.jsonl round trip
+    # between actions leaves behind, so titles derived from it downstream
+    # match the unfused pipeline.
+    for name in df.columns:
+        df[name].attrs = table_jsonl_field(name, df[name].attrs)
+
+    df.attrs = dict(title=df.attrs.get('title', ''),
+                    description=df.attrs.get('description', ''))
+
+    return df
@@ -6,15 +6,36 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import numpy as np
 import pandas as pd
-from statsmodels.stats.multitest import multipletests
 
 
 def fdr_benjamini_hochberg(stats: pd.DataFrame) -> pd.DataFrame:
-    stats['q-value'] = multipletests(stats['p-value'], method='fdr_bh')[1]
+    stats['q-value'] = _bh_adjust(stats['p-value'].to_numpy(dtype=float))
     stats['q-value'].attrs.update({
         'title': 'Benjamini-Hochberg',
         'description': 'Adjusted p-values to control false-discovery rate.'
     })
 
     return stats
+
+
+def _bh_adjust(p_vals):
+    # Benjamini-Hochberg step-up adjustment: q_(i) = min_{j >= i} p_(j) m / j
+    # over the sorted p-values. NaN p-values (e.g. from empty comparisons)
+    # are left as NaN and do not count towards the number of tests m.
+    q_vals = np.full(p_vals.shape, np.nan)
+    tested = ~np.isnan(p_vals)
+    if tested.all():
+        order = np.argsort(p_vals)
+    elif tested.any():
+        tested, = np.nonzero(tested)
+        order = tested[np.argsort(p_vals[tested])]
+    else:
+        return q_vals
+
+    ranks = np.arange(1, len(order) + 1) / len(order)
+    adjusted = np.minimum.accumulate((p_vals[order] / ranks)[::-1])[::-1]
+    q_vals[order] = np.minimum(adjusted, 1)
+
+    return q_vals
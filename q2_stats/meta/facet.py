@@ -7,16 +7,103 @@
 # ----------------------------------------------------------------------------
 
 import re
+import functools
+import collections.abc
+
+import numpy as np
 import pandas as pd
 
-from .correction import fdr_benjamini_hochberg
+from .correction import fdr_benjamini_hochberg, _bh_adjust
+from ..types import TableJSONLFileFormat, TableJSONLHeader, TableJSONLChunks
+from ..types._table_jsonl import decode_table_jsonl, encode_table_jsonl
+from ..util import table_jsonl_header
 
 
 def _clean_keys(keys):
     return re.sub(r'[^a-zA-Z0-9_\.\-\+]', '.', '__'.join(map(str, keys)))
 
 
+class _Facets:
+    """
+    The facets of `distribution` grouped by the columns `by`.
+
+    The facet keys and sizes are known up front. On first use the rows are
+    sorted by facet once into a single base frame (passed through `reshape`
+    if given), and each facet is the contiguous range
+    ``bounds[i]:bounds[i + 1]`` of it, so a facet is a cheap positional
+    slice of the base frame rather than a copy. Rows with a missing key are
+    dropped, as with `DataFrame.groupby`.
+    """
+
+    def __init__(self, distribution, by, reshape=None):
+        self.distribution = distribution
+        self.reshape = reshape
+
+        self._grouped = distribution.groupby(by, observed=True)
+        sizes = self._grouped.size()
+
+        self.keys = [key if isinstance(key, tuple) else (key,)
+                     for key in sizes.index]
+        self.bounds = np.concatenate([[0], np.cumsum(sizes.to_numpy())])
+
+    @functools.cached_property
+    def base(self):
+        codes = self._grouped.ngroup().to_numpy(dtype=float)
+        order = np.argsort(codes, kind='stable')
+        order = order[codes[order] >= 0]
+
+        base = self.distribution.take(order)
+        if self.reshape is not None:
+            base = self.reshape(base)
+
+        return base
+
+    def __len__(self):
+        return len(self.keys)
+
+    def view(self, i):
+        return self.base.iloc[self.bounds[i]:self.bounds[i + 1]]
+
+    def items(self):
+        for i, keys in enumerate(self.keys):
+            yield keys, self.view(i)
+
+
+class _LazyFacetCollection(collections.abc.Mapping):
+    """
+    A mapping of cleaned facet keys to facets that only slices out (and
+    passes through `prepare`) a facet when it is looked up.
+    """
+
+    def __init__(self, facets, prepare):
+        self._facets = facets
+        self._prepare = prepare
+        self._index = {_clean_keys(keys): i
+                       for i, keys in enumerate(facets.keys)}
+
+    def __getitem__(self, key):
+        i = self._index[key]
+        return self._prepare(self._facets.view(i), self._facets.keys[i])
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+
 def facet_within(distribution: pd.DataFrame) -> pd.DataFrame:
+    return dict(lazy_facet_within(distribution))
+
+
+def facet_across(distribution: pd.DataFrame) -> pd.DataFrame:
+    return dict(lazy_facet_across(distribution))
+
+
+def lazy_facet_within(distribution):
+    """
+    `facet_within`, but facets are only materialized when looked up.
+    """
     if 'group' in distribution.columns:
         groupby = ['group', 'class']
         facet_title = distribution['group'].attrs.get('title', 'group')
@@ -24,10 +111,11 @@ def facet_within(distribution: pd.DataFrame) -> pd.DataFrame:
         groupby = ['class']
         facet_title = distribution['class'].attrs.get('title', 'class')
 
-    facets = {}
-    for keys, df in distribution.groupby(groupby):
+    def reshape(df):
         df['group'] = df['level']
-        df = df.drop(['class', 'level'], axis='columns')
+        return df.drop(['class', 'level'], axis='columns')
+
+    def prepare(df, keys):
         df['group'].attrs.update({
             'title': keys[-1]
         })
@@ -35,42 +123,171 @@ def facet_within(distribution: pd.DataFrame) -> pd.DataFrame:
         df.attrs.update({
             'title': facet_title
         })
-        facets[_clean_keys(keys)] = df
+        return df
 
-    return facets
+    facets = _Facets(distribution, groupby, reshape=reshape)
+    return _LazyFacetCollection(facets, prepare)
 
 
-def facet_across(distribution: pd.DataFrame) -> pd.DataFrame:
-    facets = {}
-    for keys, df in distribution.groupby(['class', 'level']):
-        df = df.drop(['class', 'level'], axis='columns')
+def lazy_facet_across(distribution):
+    """
+    `facet_across`, but facets are only materialized when looked up.
+    """
+    def reshape(df):
+        return df.drop(['class', 'level'], axis='columns')
 
+    def prepare(df, keys):
         for col in df.columns:
             df[col].attrs = distribution[col].attrs
+        return df
+
+    facets = _Facets(distribution, ['class', 'level'], reshape=reshape)
+    return _LazyFacetCollection(facets, prepare)
+
+
+def collate_stats(tables: TableJSONLFileFormat) -> TableJSONLFileFormat:
+    """
+    Collate the stats `tables` and FDR correct them together in two passes.
+
+    The first pass reads the header of each table and decodes only its
+    p-values and the fields that can be numeric, whose dtypes decide how
+    the collated values are written. The second re-reads the tables one at
+    a time, fills in their q-values and appends them to the output. At most
+    one table is held in memory at a time. The result matches
+    `collate_stats_df`.
+    """
+    p_vals = []
+    groups = set()
+    dtypes = {}
+    attrs = None
+    last = None
+    for key, table in tables.items():
+        header = TableJSONLHeader(str(table))
+        df = _facet_table(key, _header_frame(header))
+        groups.update(_group_titles(df))
 
-        facets[_clean_keys(keys)] = df
+        # pd.concat only keeps the table attrs when they all agree
+        if attrs is None:
+            attrs = df.attrs
+        elif attrs != df.attrs:
+            attrs = {}
+        last = df
+
+        fields = [spec for spec in header.header['fields']
+                  if spec['type'] not in _TEXT_FIELDS
+                  or spec['name'] == 'p-value']
+        columns = [spec['name'] for spec in fields]
+        chunks = TableJSONLChunks(str(table), columns=columns)
+
+        table_dtypes = {}
+        for chunk in chunks:
+            p_vals.append(chunk['p-value'].to_numpy(dtype=float))
+            for col, dtype in chunk.dtypes.items():
+                table_dtypes[col] = _common_dtype(
+                    table_dtypes.get(col, dtype), dtype)
+        if not table_dtypes:
+            # a table without rows has the dtypes of its empty columns
+            table_dtypes = decode_table_jsonl([], fields).dtypes.to_dict()
+
+        for col, dtype in table_dtypes.items():
+            dtypes[col] = _common_dtype(dtypes.get(col, dtype), dtype)
+
+    q_vals = _bh_adjust(np.concatenate(p_vals or [[]]))
+
+    # text fields are written the same whatever dtype they are collated
+    # into, so only the numeric ones are converted
+    dtypes = {col: dtype for col, dtype in dtypes.items()
+              if pd.api.types.is_numeric_dtype(dtype)}
+
+    head = pd.DataFrame(columns=last.columns)
+    head.attrs = dict(attrs)
+    head = fdr_benjamini_hochberg(head)
+    _collated_attrs(head, last, groups)
+
+    ff = TableJSONLFileFormat()
+    with ff.open() as fh:
+        fh.write(table_jsonl_header(head))
+        fh.write('\n')
 
-    return facets
+        start = 0
+        for key, table in tables.items():
+            df = _facet_table(key, table.view(pd.DataFrame))
+            if df.empty:
+                continue
 
+            df = df.astype(dtypes)
+            df['q-value'] = q_vals[start:start + len(df)]
+            start += len(df)
 
-def collate_stats(tables: pd.DataFrame) -> pd.DataFrame:
+            encode_table_jsonl(df, fh)
+
+    return ff
+
+
+def collate_stats_df(tables: pd.DataFrame) -> pd.DataFrame:
+    """
+    Collate and FDR correct the stats `tables` in memory.
+    """
     stats = []
     last = None
     groups = set()
     for key, df in tables.items():
-        df.insert(0, 'facet', key)
-        df['facet'].attrs.update({
-            'title': df.attrs.get('title', 'facet')
-        })
+        df = _facet_table(key, df)
         stats.append(df)
 
         last = df
-        groups.add(df['A:group'].attrs.get('title', 'group'))
-        groups.add(df['B:group'].attrs.get('title', 'group'))
+        groups.update(_group_titles(df))
 
     stats = pd.concat(stats)
     stats = fdr_benjamini_hochberg(stats)
+    _collated_attrs(stats, last, groups)
+
+    return stats
+
+
+def _facet_table(key, df):
+    df.insert(0, 'facet', key)
+    df['facet'].attrs.update({
+        'title': df.attrs.get('title', 'facet')
+    })
+
+    return df
+
+
+# table.jsonl field types that never decode into a numeric column
+_TEXT_FIELDS = {'string', 'datetime', 'date', 'time', 'duration'}
+
+
+def _header_frame(header):
+    # a table without rows with the columns and attrs of `header`
+    df = pd.DataFrame(columns=header.columns)
+    df.attrs.update(header.attrs)
+    for col in df.columns:
+        df[col].attrs.update(header.column_attrs(col))
+
+    return df
+
 
+def _common_dtype(a, b):
+    # the dtype pd.concat gives a column that is `a` in one table and `b`
+    # in another
+    if a == b:
+        return a
+
+    numeric = pd.api.types.is_numeric_dtype
+    bool_ = pd.api.types.is_bool_dtype
+    if numeric(a) and numeric(b) and not (bool_(a) or bool_(b)):
+        return np.result_type(a, b)
+
+    return np.dtype(object)
+
+
+def _group_titles(df):
+    return {df['A:group'].attrs.get('title', 'group'),
+            df['B:group'].attrs.get('title', 'group')}
+
+
+def _collated_attrs(stats, last, groups):
     for col in last.columns:
         stats[col].attrs.update(last[col].attrs)
 
@@ -85,5 +302,3 @@ def collate_stats(tables: pd.DataFrame) -> pd.DataFrame:
     stats['B:group'].attrs.update({
         'title': group_title
     })
-
-    return stats
@@ -10,13 +10,20 @@ import os
 import pkg_resources
 import jinja2
 import json
+import numpy as np
 import pandas as pd
 
 from q2_stats.util import json_replace
 
 
+# points each density curve is evaluated at in a summarized plot
+_KDE_STEPS = 200
+# bins the measures of a group are counted into before estimating densities
+_KDE_BINS = 4096
+
+
 def plot_rainclouds(output_dir: str, data: pd.DataFrame,
-                    stats: pd.DataFrame = None):
+                    stats: pd.DataFrame = None, summarize: bool = False):
     table1 = None
     if stats is not None:
         table1, stats = _make_stats(stats)
@@ -38,13 +45,15 @@ def plot_rainclouds(output_dir: str, data: pd.DataFrame,
         data['group'] = data['class']
     if 'subject' in data.columns:
         subject_unit = data['subject'].get('title', 'subject')
+    else:
+        subject_unit = data['id'].get('title', 'sample')
+    if 'subject' in data.columns and not summarize:
         extras.update({
             'lightning': {"name": "$show_lightning",
                           "value": True,
                           "bind": {"input": "checkbox"}},
         })
     else:
-        subject_unit = data['id'].get('title', 'sample')
         extras.update({
             'lightning': {"name": "$show_lightning",
                           "value": False},
@@ -55,17 +64,32 @@ def plot_rainclouds(output_dir: str, data: pd.DataFrame,
         f' measure of {x_label} across {y_label}. Kernel density estimation'
         f' performed using a bandwidth calculated by Scott\'s method. Boxplots'
         f' show the min and max of the data (whiskers) as well as the first,'
-        f' second (median), and third quartiles (box). '
-        f' Points and connecting lines represent individual subjects'
-        f' with a consistent jitter added across groups such that slopes'
-        f' across adjacent groups are visually comparable between subjects.')
+        f' second (median), and third quartiles (box). ')
+    if summarize:
+        figure1 += (
+            f' Densities were estimated ahead of time at {_KDE_STEPS} evenly'
+            f' spaced points across the range of each group, and individual'
+            f' subjects are not shown.')
+    else:
+        figure1 += (
+            ' Points and connecting lines represent individual subjects'
+            ' with a consistent jitter added across groups such that slopes'
+            ' across adjacent groups are visually comparable between'
+            ' subjects.')
 
     index = J_ENV.get_template('index.html')
-    records = json.loads(data.to_json(orient='records'))
+    by = ['class', 'level', 'group'] if 'class' in data.columns else ['group']
+    if summarize:
+        records = json.loads(
+            _summarize(data, by).to_json(orient='records'))
+    else:
+        records = json.loads(data.to_json(orient='records'))
+    suffix = '_summary' if summarize else ''
 
     if 'class' in data.columns:
         spec_fp = pkg_resources.resource_filename(
-            'q2_stats.plots', os.path.join('specs', 'raincloud_multi.json'))
+            'q2_stats.plots',
+            os.path.join('specs', f'raincloud_multi{suffix}.json'))
         selection_opts = []
         selection_labels = []
         for cls in data['class'].unique():
@@ -83,7 +107,8 @@ def plot_rainclouds(output_dir: str, data: pd.DataFrame,
         })
     else:
         spec_fp = pkg_resources.resource_filename(
-            'q2_stats.plots', os.path.join('specs', 'raincloud_single.json'))
+            'q2_stats.plots',
+            os.path.join('specs', f'raincloud_single{suffix}.json'))
 
     with open(spec_fp) as fh:
         json_obj = json.load(fh)
@@ -98,6 +123,80 @@ def plot_rainclouds(output_dir: str, data: pd.DataFrame,
                               figure1=figure1, table1=table1))
 
 
+def _summarize(data, by):
+    """
+    Summarize the measure of each group of `data` by the `by` columns.
+
+    Each row holds the boxplot statistics of a group, named as Vega's
+    aggregate transform would name them (`min_measure`, `q1_measure`,
+    ...), the number of measures `n`, and a kernel density estimate in
+    `kde_measure` and `kde_density`. Quartiles are interpolated linearly
+    and the density follows Vega's kde transform: a Gaussian kernel with
+    Vega's estimate of Scott's bandwidth, evaluated across the range of the
+    group. Measures are binned onto a fine grid first, so the cost of an
+    estimate does not grow with the size of the group. Rows missing the
+    measure or any of the `by` labels are left out.
+    """
+    # groupby drops rows with a missing key, which would leave them
+    # without a group code when they are binned
+    data = data[data['measure'].notna() & data[by].notna().all(axis=1)]
+    grouped = data.groupby(by, observed=True, sort=True)['measure']
+
+    summary = grouped.agg(['count', 'min', 'max', 'std'])
+    quartiles = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    n = summary['count'].to_numpy()
+    lo = summary['min'].to_numpy()
+    hi = summary['max'].to_numpy()
+    q1, median, q3 = quartiles.to_numpy().T
+
+    # Vega falls back on the deviation, then the first quartile, then 1
+    # when the estimate comes out zero or undefined
+    spread = np.fmin(summary['std'].to_numpy(), (q3 - q1) / 1.34)
+    for fallback in [summary['std'].to_numpy(), np.abs(q1), 1.0]:
+        spread = np.where((spread > 0) & np.isfinite(spread),
+                          spread, fallback)
+    bandwidth = 1.06 * spread * n ** -0.2
+
+    # a group of one distinct value still gets a curve around it
+    flat = hi == lo
+    lo = np.where(flat, lo - 3 * bandwidth, lo)
+    hi = np.where(flat, hi + 3 * bandwidth, hi)
+
+    # linear binning of every measure at once: each measure is split
+    # between its two nearest bins of its group's grid
+    codes = grouped.ngroup().to_numpy()
+    bin_width = (hi - lo) / (_KDE_BINS - 1)
+    position = (data['measure'].to_numpy() - lo[codes]) / bin_width[codes]
+    left = np.clip(np.floor(position), 0, _KDE_BINS - 2).astype(np.int64)
+    right_weight = position - left
+    index = codes * _KDE_BINS + left
+    size = len(summary) * _KDE_BINS
+    counts = (np.bincount(index, weights=1 - right_weight, minlength=size)
+              + np.bincount(index + 1, weights=right_weight, minlength=size))
+    counts = counts.reshape(len(summary), _KDE_BINS)
+
+    steps = np.linspace(0, 1, _KDE_STEPS)
+    bins = np.linspace(0, 1, _KDE_BINS)
+    kde_measure, kde_density = [], []
+    for i in range(len(summary)):
+        grid = lo[i] + steps * (hi[i] - lo[i])
+        scale = (hi[i] - lo[i]) / bandwidth[i]
+        z = (steps[:, None] - bins[None, :]) * scale
+        density = (np.exp(-0.5 * z ** 2) @ counts[i]
+                   / (n[i] * bandwidth[i] * np.sqrt(2 * np.pi)))
+        kde_measure.append(grid.tolist())
+        kde_density.append(density.tolist())
+
+    result = pd.DataFrame({
+        'n': n, 'min_measure': summary['min'].to_numpy(),
+        'q1_measure': q1, 'median_measure': median, 'q3_measure': q3,
+        'max_measure': summary['max'].to_numpy(),
+        'kde_measure': kde_measure, 'kde_density': kde_density,
+    }, index=summary.index)
+
+    return result.reset_index()
+
+
 def _make_stats(stats):
     method = stats['test-statistic'].attrs['title']
     group_unit = (stats['A:group'].attrs['title']
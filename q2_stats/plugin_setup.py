@@ -10,7 +10,7 @@ import importlib
 
 from qiime2.plugin import (
     Str, Plugin, Choices, Bool, Metadata, List, TypeMap, TypeMatch,
-    Collection, Visualization, Citations)
+    Collection, Visualization, Citations, Threads)
 
 from q2_types.sample_data import SampleData, AlphaDiversity
 
@@ -46,7 +46,8 @@ plugin.methods.register_function(
     parameters={'compare': Str % Choices('reference', 'all-pairwise'),
                 'reference_group': Str,
                 'alternative': Str % Choices('two-sided', 'greater', 'less'),
-                'p_val_approx': Str % Choices('auto', 'exact', 'asymptotic')},
+                'p_val_approx': Str % Choices('auto', 'exact', 'asymptotic'),
+                'engine': Str % Choices('scipy', 'batched')},
     outputs=[('stats', StatsTable[Pairwise])],
     parameter_descriptions={
         'compare': 'The comparison that will be used to analyze the input'
@@ -72,7 +73,13 @@ plugin.methods.register_function(
                         ' distributions, "asymptotic" will use a normal'
                         ' distribution, and "auto" will use either "exact"'
                         ' when one of the groups has less than 8 observations'
-                        ' and there are no ties, otherwise "asymptotic".'
+                        ' and there are no ties, otherwise "asymptotic".',
+        'engine': '"scipy" runs a separate scipy test for every comparison.'
+                  ' "batched" sorts each group once and computes the test'
+                  ' statistics and asymptotic p-values of all comparisons'
+                  ' together with vectorized rank arithmetic, which is much'
+                  ' faster when there are many groups. Both produce the'
+                  ' same table.'
     },
     output_descriptions={
         'stats': 'The Mann-Whitney U table for either the "reference"'
@@ -93,7 +100,8 @@ plugin.methods.register_function(
                 'baseline_group': Str,
                 'alternative': Str % Choices('two-sided', 'greater', 'less'),
                 'p_val_approx': Str % Choices('auto', 'exact', 'asymptotic'),
-                'ignore_empty_comparator': Bool},
+                'ignore_empty_comparator': Bool,
+                'engine': Str % Choices('scipy', 'batched')},
     outputs=[('stats', StatsTable[Pairwise])],
     parameter_descriptions={
         'compare': 'The type of comparison that will be used to analyze the'
@@ -122,7 +130,14 @@ plugin.methods.register_function(
         'ignore_empty_comparator': 'Ignore any group that does not have any'
                                    ' overlapping subjects with comparison'
                                    ' group. These groups will have NaNs'
-                                   ' in the stats table output'
+                                   ' in the stats table output',
+        'engine': '"scipy" runs a separate scipy test for every comparison.'
+                  ' "batched" forms the paired differences of all'
+                  ' comparisons as one array and computes the signed ranks'
+                  ' and normal approximation for every comparison in a'
+                  ' single vectorized pass. Comparisons that need an exact'
+                  ' p-value are computed individually. Both produce the'
+                  ' same table.'
     },
     output_descriptions={
         'stats': 'The Wilcoxon SRT table for either the "baseline"'
@@ -145,12 +160,20 @@ plugin.visualizers.register_function(
         ],
         'stats': StatsTable[Pairwise]
     },
-    parameters={},
+    parameters={
+        'summarize': Bool,
+    },
     input_descriptions={
         'data': 'The group distributions to plot.',
         'stats': 'Statistical tests to display.'
     },
-    parameter_descriptions={},
+    parameter_descriptions={
+        'summarize': 'Compute the density curves and boxplots of each group'
+                     ' ahead of time and embed only those in the'
+                     ' visualization, instead of every measure. Individual'
+                     ' subjects are not shown. This keeps the visualization'
+                     ' responsive for very large distributions.'
+    },
     name='Raincloud plots',
     description='Plot raincloud distributions for each group.',
     examples={
@@ -234,13 +257,25 @@ plugin.pipelines.register_function(
         'distribution': T_dist
     },
     parameters={
-        'facet': T_facet
+        'facet': T_facet,
+        'fused': Bool,
+        'n_jobs': Threads
     },
     outputs={
         'stats': StatsTable[Pairwise]
     },
     parameter_descriptions={
-        'facet': 'Whether to facet within or across the outer group.'
+        'facet': 'Whether to facet within or across the outer group.',
+        'fused': 'Run the faceting, per-facet tests and collation in'
+                 ' memory within this pipeline instead of as separate'
+                 ' actions. The resulting table is the same, but the'
+                 ' intermediate facets and per-facet tables are not'
+                 ' recorded in provenance.',
+        'n_jobs': 'The number of worker processes used to test the'
+                  ' facets. 0 or "auto" uses all available CPUs. Can'
+                  ' only be set together with `fused`; otherwise, run'
+                  ' the pipeline with QIIME 2\'s parallel execution'
+                  ' instead to test the facets concurrently.'
     },
     citations=[citations['MannWhitney1947']],
     name='Per-facet Mann-Whitney U Test',
@@ -259,12 +294,24 @@ plugin.pipelines.register_function(
     },
     parameters={
         'ignore_empty_comparator': Bool,
+        'fused': Bool,
+        'n_jobs': Threads,
     },
     parameter_descriptions={
         'ignore_empty_comparator': 'Ignore any group that does not have any'
                                    ' overlapping subjects with comparison'
                                    ' group. These groups will have NaNs'
-                                   ' in the stats table output'
+                                   ' in the stats table output',
+        'fused': 'Run the faceting, per-facet tests and collation in'
+                 ' memory within this pipeline instead of as separate'
+                 ' actions. The resulting table is the same, but the'
+                 ' intermediate facets and per-facet tables are not'
+                 ' recorded in provenance.',
+        'n_jobs': 'The number of worker processes used to test the'
+                  ' facets. 0 or "auto" uses all available CPUs. Can'
+                  ' only be set together with `fused`; otherwise, run'
+                  ' the pipeline with QIIME 2\'s parallel execution'
+                  ' instead to test the facets concurrently.'
     },
     outputs={
         'stats': StatsTable[Pairwise]
@@ -0,0 +1,50 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2024, QIIME 2 development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from q2_stats.meta import fdr_benjamini_hochberg
+
+
+class TestFDRBenjaminiHochberg(unittest.TestCase):
+    def test_adjusted(self):
+        stats = pd.DataFrame({'p-value': [0.01, 0.04, 0.03, 0.005]})
+
+        obs = fdr_benjamini_hochberg(stats)
+
+        np.testing.assert_allclose(obs['q-value'], [0.02, 0.04, 0.04, 0.02])
+        self.assertEqual(obs['q-value'].attrs['title'], 'Benjamini-Hochberg')
+
+    def test_capped_at_one(self):
+        stats = pd.DataFrame({'p-value': [0.9, 0.8, 0.95]})
+
+        obs = fdr_benjamini_hochberg(stats)
+
+        np.testing.assert_allclose(obs['q-value'], [0.95, 0.95, 0.95])
+
+    def test_nan_ignored(self):
+        stats = pd.DataFrame({'p-value': [0.01, np.nan, 0.04, 0.03, np.nan]})
+
+        obs = fdr_benjamini_hochberg(stats)
+
+        np.testing.assert_allclose(
+            obs['q-value'], [0.03, np.nan, 0.04, 0.04, np.nan])
+
+    def test_all_nan(self):
+        stats = pd.DataFrame({'p-value': [np.nan, np.nan]})
+
+        obs = fdr_benjamini_hochberg(stats)
+
+        self.assertTrue(obs['q-value'].isna().all())
+
+
+if __name__ == '__main__':
+    unittest.main()
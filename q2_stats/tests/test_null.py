@@ -0,0 +1,124 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2024, QIIME 2 development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import scipy.stats
+
+from q2_stats.hypotheses._null import (
+    NullDistributionCache, _mannwhitneyu_sf, _wilcoxon_sf)
+
+
+class TestNullDistributionCache(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def compute(n1, n2):
+            self.calls.append((n1, n2))
+            return _mannwhitneyu_sf(n1, n2)
+
+        self.compute = compute
+
+    def test_memoized(self):
+        cache = NullDistributionCache('test', self.compute)
+
+        first = cache.get((3, 4))
+        second = cache.get((3, 4))
+
+        self.assertIs(first, second)
+        self.assertEqual(self.calls, [(3, 4)])
+
+    def test_cache_info(self):
+        cache = NullDistributionCache('test', self.compute, maxsize=8)
+
+        for _ in range(200):
+            cache.get((3, 4))
+        cache.get((5, 5))
+
+        info = cache.cache_info()
+        self.assertEqual(info.hits, 199)
+        self.assertEqual(info.misses, 2)
+        self.assertEqual(info.maxsize, 8)
+        self.assertEqual(info.currsize, 2)
+        self.assertEqual(self.calls, [(3, 4), (5, 5)])
+
+    def test_lru_eviction(self):
+        cache = NullDistributionCache('test', self.compute, maxsize=2)
+
+        cache.get((1, 2))
+        cache.get((2, 2))
+        cache.get((1, 2))
+        cache.get((2, 3))
+
+        self.assertEqual(len(cache), 2)
+        self.assertIn((1, 2), cache)
+        self.assertNotIn((2, 2), cache)
+
+    def test_persisted_to_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = NullDistributionCache('test', self.compute, directory=tmp)
+            exp = cache.get((4, 5))
+
+            self.assertTrue(
+                os.path.exists(os.path.join(tmp, 'test-4-5.npy')))
+
+            fresh = NullDistributionCache('test', self.compute,
+                                          directory=tmp)
+            obs = fresh.get((4, 5))
+
+        np.testing.assert_array_equal(obs, exp)
+        self.assertEqual(self.calls, [(4, 5)])
+
+
+class TestMannWhitneyUNull(unittest.TestCase):
+    def test_matches_scipy_exact(self):
+        rng = np.random.default_rng(42)
+        for n1, n2 in [(1, 1), (2, 7), (5, 5), (8, 13)]:
+            sf = _mannwhitneyu_sf(n1, n2)
+            for _ in range(5):
+                x = rng.normal(size=n1)
+                y = rng.normal(size=n2)
+                stat, p_val = scipy.stats.mannwhitneyu(
+                    x, y, method='exact', alternative='greater')
+
+                self.assertAlmostEqual(sf[int(stat)], p_val)
+
+    def test_sums_to_one(self):
+        sf = _mannwhitneyu_sf(6, 9)
+
+        self.assertAlmostEqual(sf[0], 1.0)
+        self.assertEqual(len(sf), 6 * 9 + 1)
+
+
+class TestWilcoxonNull(unittest.TestCase):
+    def test_matches_scipy_exact(self):
+        rng = np.random.default_rng(42)
+        for n in [1, 4, 10, 25]:
+            sf = _wilcoxon_sf(n)
+            for _ in range(5):
+                x = rng.normal(size=n)
+                y = rng.normal(size=n)
+                _, p_val = scipy.stats.wilcoxon(x, y, alternative='greater')
+
+                d = x - y
+                ranks = scipy.stats.rankdata(np.abs(d))
+                r_plus = int(np.sum(ranks[d > 0]))
+                self.assertAlmostEqual(sf[r_plus], p_val)
+
+    def test_sums_to_one(self):
+        sf = _wilcoxon_sf(12)
+
+        self.assertAlmostEqual(sf[0], 1.0)
+        self.assertEqual(len(sf), 12 * 13 // 2 + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2024, QIIME 2 development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import json
+import os
+import re
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from q2_stats.plots import plot_rainclouds
+from q2_stats.plots.raincloud import _summarize, _KDE_STEPS
+
+
+class TestSummarize(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data = pd.DataFrame({
+            'id': ['S%d' % i for i in range(235)],
+            'measure': np.r_[rng.normal(0, 1, 200), rng.exponential(2, 30),
+                             [5.0], [1.0, 1.0, 1.0, 1.0]],
+            'group': np.repeat(['a', 'b', 'c', 'd'], [200, 30, 1, 4]),
+        })
+
+    def _exact_density(self, values, grid):
+        # Vega's bandwidth estimate and Gaussian kernel, without binning
+        q1, q3 = np.quantile(values, [0.25, 0.75])
+        deviation = np.std(values, ddof=1) if len(values) > 1 else np.nan
+        spread = np.fmin(deviation, (q3 - q1) / 1.34)
+        for fallback in [deviation, abs(q1), 1.0]:
+            if not (spread > 0 and np.isfinite(spread)):
+                spread = fallback
+        bandwidth = 1.06 * spread * len(values) ** -0.2
+
+        z = (grid[:, None] - values[None, :]) / bandwidth
+        return (np.exp(-0.5 * z ** 2).sum(axis=1)
+                / (len(values) * bandwidth * np.sqrt(2 * np.pi)))
+
+    def test_boxplot_statistics(self):
+        obs = _summarize(self.data, ['group'])
+
+        self.assertEqual(list(obs['group']), ['a', 'b', 'c', 'd'])
+        self.assertEqual(list(obs['n']), [200, 30, 1, 4])
+        for _, row in obs.iterrows():
+            values = self.data['measure'][self.data['group'] == row['group']]
+            exp = np.quantile(values, [0, 0.25, 0.5, 0.75, 1])
+            np.testing.assert_allclose(
+                row[['min_measure', 'q1_measure', 'median_measure',
+                     'q3_measure', 'max_measure']].astype(float), exp)
+
+    def test_density(self):
+        obs = _summarize(self.data, ['group'])
+
+        for _, row in obs.iterrows():
+            values = self.data['measure'][
+                self.data['group'] == row['group']].to_numpy()
+            grid = np.array(row['kde_measure'])
+            self.assertEqual(len(grid), _KDE_STEPS)
+
+            exp = self._exact_density(values, grid)
+            np.testing.assert_allclose(row['kde_density'], exp,
+                                       atol=1e-5 * exp.max())
+
+    def test_density_of_one_value_spans_it(self):
+        obs = _summarize(self.data, ['group']).set_index('group')
+
+        grid = obs.loc['d', 'kde_measure']
+        self.assertLess(grid[0], 1.0)
+        self.assertGreater(grid[-1], 1.0)
+
+    def test_ignores_missing_measures(self):
+        data = self.data.copy()
+        data.loc[0, 'measure'] = np.nan
+
+        obs = _summarize(data, ['group'])
+
+        self.assertEqual(obs['n'][0], 199)
+
+    def test_ignores_missing_labels(self):
+        data = self.data.assign(level=np.where(
+            np.arange(len(self.data)) % 3, 'x', None))
+
+        obs = _summarize(data, ['level', 'group'])
+
+        exp = data.groupby(['level', 'group']).size()
+        self.assertEqual(list(obs['n']), list(exp))
+        self.assertEqual(set(obs['level']), {'x'})
+
+    def test_nested_groups(self):
+        data = self.data.assign(
+            **{'class': 'gut', 'level': np.where(
+                np.arange(len(self.data)) % 2, 'x', 'y')})
+
+        obs = _summarize(data, ['class', 'level', 'group'])
+
+        exp = data.groupby(['class', 'level', 'group']).size()
+        self.assertEqual(list(obs['n']), list(exp))
+        self.assertEqual(list(obs.columns[:3]), ['class', 'level', 'group'])
+
+
+class TestPlotRainclouds(unittest.TestCase):
+    def _spec(self, data, **kwargs):
+        with tempfile.TemporaryDirectory() as output_dir:
+            plot_rainclouds(output_dir, data, **kwargs)
+            with open(os.path.join(output_dir, 'index.html')) as fh:
+                html = fh.read()
+
+        spec = re.search(r'id="spec">(.*?)</script>', html, re.S).group(1)
+        return json.loads(spec)
+
+    def test_summarize(self):
+        data = pd.DataFrame({
+            'id': ['S%d' % i for i in range(1000)],
+            'measure': np.linspace(0, 1, 1000),
+            'group': np.repeat([1, 2], 500),
+            'subject': ['P%d' % (i % 500) for i in range(1000)],
+        })
+
+        spec = self._spec(data, summarize=True)
+
+        table, = [d for d in spec['data'] if d['name'] == 'table']
+        self.assertEqual([row['group'] for row in table['values']], [1, 2])
+        self.assertNotIn('measure', table['values'][0])
+        lightning, = [s for s in spec['signals']
+                      if s['name'] == '$show_lightning']
+        self.assertFalse(lightning['value'])
+
+    def test_summarize_nested(self):
+        data = pd.DataFrame({
+            'id': ['S%d' % i for i in range(8)],
+            'measure': np.arange(8.0),
+            'class': ['gut'] * 4 + ['oral'] * 4,
+            'level': ['a', 'b'] * 4,
+            'group': [0, 0, 1, 1] * 2,
+        })
+
+        spec = self._spec(data, summarize=True)
+
+        table, = [d for d in spec['data'] if d['name'] == 'full_table']
+        self.assertEqual(len(table['values']), 8)
+
+    def test_summarize_missing_level(self):
+        data = pd.DataFrame({
+            'id': ['S%d' % i for i in range(6)],
+            'measure': np.arange(6.0),
+            'class': 'gut',
+            'level': ['x', 'x', 'y', 'y', np.nan, np.nan],
+            'group': [0, 1] * 3,
+        })
+
+        spec = self._spec(data, summarize=True)
+
+        table, = [d for d in spec['data'] if d['name'] == 'full_table']
+        self.assertEqual([row['level'] for row in table['values']],
+                         ['x', 'x', 'y', 'y'])
+
+
+if __name__ == '__main__':
+    unittest.main()
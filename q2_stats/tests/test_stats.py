@@ -9,12 +9,21 @@
 import pandas as pd
 import numpy as np
 
+import qiime2
 from qiime2.plugin.testing import TestPluginBase
 
 from q2_stats.hypotheses.pairwise import (
-    wilcoxon_srt, mann_whitney_u, _compare_wilcoxon)
+    wilcoxon_srt, mann_whitney_u, _compare_wilcoxon, _index_groups,
+    _SubjectMatrix)
+from q2_stats.hypotheses.pairwise_facet import (
+    _fused_facet_stats, mann_whitney_u_facet, wilcoxon_srt_facet)
+from q2_stats.meta.facet import (
+    facet_within, facet_across, lazy_facet_within, collate_stats,
+    collate_stats_df, _Facets)
+from q2_stats.types import TableJSONLFileFormat
 from q2_stats.examples import (faithpd_timedist_factory,
-                               faithpd_refdist_factory)
+                               faithpd_refdist_factory,
+                               synth_no_i_factory, synth_no_m_factory)
 
 
 class TestBase(TestPluginBase):
@@ -118,6 +127,81 @@ class TestStats(TestBase):
             wilcoxon_srt(distribution=self.faithpd_timedist,
                          compare='consecutive', alternative='foo')
 
+    def test_wilcoxon_batched_matches_scipy(self):
+        for compare, baseline_group in [('baseline', '0'),
+                                        ('consecutive', None)]:
+            for alternative in ['two-sided', 'greater', 'less']:
+                for p_val_approx in ['auto', 'exact', 'asymptotic']:
+                    exp = wilcoxon_srt(distribution=self.faithpd_timedist,
+                                       compare=compare,
+                                       baseline_group=baseline_group,
+                                       alternative=alternative,
+                                       p_val_approx=p_val_approx)
+                    obs = wilcoxon_srt(distribution=self.faithpd_timedist,
+                                       compare=compare,
+                                       baseline_group=baseline_group,
+                                       alternative=alternative,
+                                       p_val_approx=p_val_approx,
+                                       engine='batched')
+
+                    pd.testing.assert_frame_equal(obs, exp)
+                    for col in exp.columns:
+                        self.assertEqual(obs[col].attrs, exp[col].attrs)
+
+    def test_wilcoxon_batched_ties_and_zeros(self):
+        rng = np.random.default_rng(0)
+        n = 60
+        dist = pd.DataFrame({
+            'id': [f'S{i}' for i in range(3 * n)],
+            'measure': np.round(rng.normal(size=3 * n)),
+            'group': [0] * n + [1] * n + [2] * n,
+            'subject': [f'P{i}' for i in range(n)] * 3
+        })
+
+        exp = wilcoxon_srt(dist, 'consecutive', p_val_approx='asymptotic')
+        obs = wilcoxon_srt(dist, 'consecutive', p_val_approx='asymptotic',
+                           engine='batched')
+
+        pd.testing.assert_frame_equal(obs, exp)
+
+    def test_wilcoxon_batched_ignore_comparator(self):
+        dist = pd.DataFrame({
+            'id': ['S1', 'S2', 'S3', 'S4'],
+            'measure': [0.9002, 0.8221, 0.0981, 0.0100],
+            'group': [1, 1, 2, 2],
+            'subject': ['P1', 'P2', 'P3', 'P4']
+        })
+
+        obs = wilcoxon_srt(dist, 'baseline', baseline_group=1,
+                           ignore_empty_comparator=True, engine='batched')
+
+        self.assertEqual(obs['n'].tolist(), [0])
+        self.assertTrue(np.isnan(obs['p-value'][0]))
+
+        with self.assertRaisesRegex(ValueError, 'no subject overlap'):
+            wilcoxon_srt(dist, 'baseline', baseline_group=1,
+                         engine='batched')
+
+    def test_wilcoxon_missing_group(self):
+        dist = pd.DataFrame({
+            'id': [f'S{i}' for i in range(9)],
+            'measure': [1.0, 2.0, 3.0, 2.0, 4.0, 7.0, 5.0, 6.0, 8.0],
+            'group': [0, 0, 0, 1, 1, 1, np.nan, np.nan, np.nan],
+            'subject': ['P1', 'P2', 'P3'] * 3
+        })
+
+        for engine in ['scipy', 'batched']:
+            obs = wilcoxon_srt(dist, 'consecutive',
+                               ignore_empty_comparator=True, engine=engine)
+
+            # rows without a group never stand in for another group
+            self.assertEqual(obs['A:n'].tolist(), [3, 3])
+            self.assertEqual(obs['B:n'].tolist(), [3, 0])
+            self.assertEqual(obs['n'].tolist(), [3, 0])
+            self.assertEqual(obs['test-statistic'][0], 0.0)
+            self.assertEqual(obs['p-value'][0], 0.25)
+            self.assertTrue(np.isnan(obs['p-value'][1]))
+
     # Mann-Whitney U test cases
 
     # Data in the exp_stats_data dataframes were calculated 'by hand' in a
@@ -226,9 +310,195 @@ class TestStats(TestBase):
             mann_whitney_u(distribution=self.faithpd_refdist,
                            compare='all-pairwise', alternative='foo')
 
+    def test_mann_whitney_batched_matches_scipy(self):
+        for alternative in ['two-sided', 'greater', 'less']:
+            for p_val_approx in ['auto', 'exact', 'asymptotic']:
+                exp = mann_whitney_u(distribution=self.faithpd_refdist,
+                                     against_each=self.faithpd_timedist,
+                                     compare='all-pairwise',
+                                     alternative=alternative,
+                                     p_val_approx=p_val_approx)
+                obs = mann_whitney_u(distribution=self.faithpd_refdist,
+                                     against_each=self.faithpd_timedist,
+                                     compare='all-pairwise',
+                                     alternative=alternative,
+                                     p_val_approx=p_val_approx,
+                                     engine='batched')
+
+                pd.testing.assert_frame_equal(obs, exp)
+                for col in exp.columns:
+                    self.assertEqual(obs[col].attrs, exp[col].attrs)
+
+    def test_mann_whitney_batched_with_ties(self):
+        dist = pd.DataFrame({
+            'id': [f'S{i}' for i in range(12)],
+            'measure': [1.0, 2.0, 2.0, 3.0, 2.0, 3.0, 3.0, 4.0,
+                        1.0, 1.0, 4.0, 4.0],
+            'group': ['a'] * 4 + ['b'] * 4 + ['c'] * 4
+        })
+
+        exp = mann_whitney_u(dist, 'all-pairwise')
+        obs = mann_whitney_u(dist, 'all-pairwise', engine='batched')
+
+        pd.testing.assert_frame_equal(obs, exp)
+
+    def test_mann_whitney_empty_group(self):
+        # with the empty group in a different place among the Group A keys
+        for groups in ([0, 0, 1, 1, np.nan, np.nan],
+                       [1, 1, np.nan, 0, 0, np.nan]):
+            dist = pd.DataFrame({
+                'id': [f'S{i}' for i in range(6)],
+                'measure': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+                'group': groups
+            })
+
+            for engine in ['scipy', 'batched']:
+                for p_val_approx in ['auto', 'exact', 'asymptotic']:
+                    with self.assertRaisesRegex(ValueError, 'nonzero size'):
+                        mann_whitney_u(dist, 'all-pairwise',
+                                       p_val_approx=p_val_approx,
+                                       engine=engine)
+
+    def test_mann_whitney_invalid_engine(self):
+        with self.assertRaisesRegex(ValueError, "Invalid `engine`"):
+            mann_whitney_u(distribution=self.faithpd_refdist,
+                           compare='all-pairwise', engine='foo')
+
+    def test_subject_matrix(self):
+        dist = pd.DataFrame({
+            'id': ['S1', 'S2', 'S3', 'S4', 'S5'],
+            'measure': [1.0, 2.0, 3.0, float('nan'), 5.0],
+            'group': [0, 0, 1, 1, 1],
+            'subject': ['P1', 'P2', 'P2', 'P1', 'P3']
+        })
+
+        matrix = _SubjectMatrix(dist)
+
+        pd.testing.assert_series_equal(
+            matrix.column(1),
+            pd.Series([float('nan'), 3.0, 5.0], name='measure',
+                      index=pd.Index(['P1', 'P2', 'P3'], name=1)))
+        paired_a, paired_b = matrix.pairs(0, 1)
+        np.testing.assert_array_equal(paired_a, [2.0])
+        np.testing.assert_array_equal(paired_b, [3.0])
+
+    def test_index_groups(self):
+        index = _index_groups(self.faithpd_refdist)
+
+        self.assertEqual(set(index), {'control', 'reference'})
+        for group, measures in index.items():
+            exp = self.faithpd_refdist[
+                self.faithpd_refdist['group'] == group]['measure']
+            np.testing.assert_array_equal(measures, exp.to_numpy())
+
+    def test_facets(self):
+        dist = pd.DataFrame({
+            'id': ['s1', 's2', 's3', 's4', 's5', 's6'],
+            'measure': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+            'class': ['b', 'a', 'b', None, 'a', 'b'],
+            'level': ['x', 'x', 'y', 'x', 'x', 'x']})
+
+        facets = _Facets(dist, ['class', 'level'])
+
+        self.assertEqual(facets.keys, [('a', 'x'), ('b', 'x'), ('b', 'y')])
+        np.testing.assert_array_equal(facets.bounds, [0, 2, 4, 5])
+        obs = {keys: df['id'].tolist() for keys, df in facets.items()}
+        self.assertEqual(obs, {('a', 'x'): ['s2', 's5'],
+                               ('b', 'x'): ['s1', 's6'],
+                               ('b', 'y'): ['s3']})
+
+    def test_lazy_facet_within(self):
+        dist = pd.DataFrame({
+            'id': ['s1', 's2', 's3', 's4'],
+            'measure': [1.0, 2.0, 3.0, 4.0],
+            'class': ['b', 'a', 'b', 'a'],
+            'level': ['x', 'x', 'y', 'y']})
+
+        facets = lazy_facet_within(dist)
+
+        self.assertEqual(list(facets), ['a', 'b'])
+        self.assertNotIn('base', vars(facets._facets))
+
+        obs = facets['b']
+        self.assertEqual(obs['group'].tolist(), ['x', 'y'])
+        self.assertEqual(obs['group'].attrs['title'], 'b')
+        self.assertEqual(obs.attrs['title'], 'class')
+        self.assertEqual(list(obs.columns), ['id', 'measure', 'group'])
+
+    def test_facet_across_matches_groupby(self):
+        dist = synth_no_m_factory().view(pd.DataFrame)
+
+        facets = facet_across(dist)
+
+        groups = dist.groupby(['class', 'level'])
+        self.assertEqual(len(facets), groups.ngroups)
+        for (cls, level), exp in groups:
+            obs = facets[f'{cls}__{level}']
+            exp = exp.drop(['class', 'level'], axis='columns')
+            pd.testing.assert_frame_equal(obs, exp)
+            self.assertEqual(obs['measure'].attrs, dist['measure'].attrs)
+
     def test_examples(self):
         self.execute_examples()
 
+    def test_mann_whitney_facet_fused(self):
+        facet_pipeline = self.plugin.pipelines['mann_whitney_u_facet']
+        dist = synth_no_i_factory()
+
+        for facet in ('within', 'across'):
+            exp, = facet_pipeline(dist, facet=facet)
+            obs, = facet_pipeline(dist, facet=facet, fused=True)
+
+            pd.testing.assert_frame_equal(obs.view(pd.DataFrame),
+                                          exp.view(pd.DataFrame))
+
+    def test_wilcoxon_facet_fused(self):
+        facet_pipeline = self.plugin.pipelines['wilcoxon_srt_facet']
+        dist = synth_no_m_factory()
+
+        exp, = facet_pipeline(dist)
+        obs, = facet_pipeline(dist, fused=True)
+
+        pd.testing.assert_frame_equal(obs.view(pd.DataFrame),
+                                      exp.view(pd.DataFrame))
+
+    def test_collate_stats_streaming(self):
+        dist = self.faithpd_refdist
+        tables = {}
+        for key, alternative in [('less', 'less'), ('more', 'greater')]:
+            stats = mann_whitney_u(dist, compare='all-pairwise',
+                                   alternative=alternative)
+            tables[key] = qiime2.Artifact.import_data(
+                'StatsTable[Pairwise]', stats).view(TableJSONLFileFormat)
+
+        exp = collate_stats_df({key: table.view(pd.DataFrame)
+                                for key, table in tables.items()})
+        obs = collate_stats(tables).view(pd.DataFrame)
+
+        pd.testing.assert_frame_equal(obs, exp.reset_index(drop=True),
+                                      check_dtype=False)
+        self.assertEqual(list(obs['facet'].unique()), ['less', 'more'])
+        for col in exp.columns:
+            self.assertEqual(obs[col].attrs['title'], exp[col].attrs['title'])
+
+    def test_fused_facet_stats_n_jobs(self):
+        dist = synth_no_i_factory()
+
+        exp = _fused_facet_stats(dist.view(pd.DataFrame), facet_within,
+                                 mann_whitney_u, compare='all-pairwise')
+        obs = _fused_facet_stats(dist.view(pd.DataFrame), facet_within,
+                                 mann_whitney_u, n_jobs=2,
+                                 compare='all-pairwise')
+
+        pd.testing.assert_frame_equal(obs, exp)
+        for col in exp.columns:
+            self.assertEqual(obs[col].attrs, exp[col].attrs)
+
+    def test_facet_n_jobs_requires_fused(self):
+        for pipeline in (mann_whitney_u_facet, wilcoxon_srt_facet):
+            with self.assertRaisesRegex(ValueError, 'together with `fused`'):
+                pipeline(None, None, n_jobs=2)
+
     def test_ignore_comparator_false(self):
         groupa_dict = {"subject1": 0.8091,
                        "subject2": 0.09271, "subject3": 0.9290}
@@ -8,7 +8,10 @@
 
 import unittest
 
-from q2_stats.util import json_replace
+import pandas as pd
+
+from q2_stats.util import (json_replace, categorize_columns,
+                           table_jsonl_summary)
 
 
 class TestJSONReplace(unittest.TestCase):
@@ -61,5 +64,68 @@ class TestJSONReplace(unittest.TestCase):
         })
 
 
+class TestCategorizeColumns(unittest.TestCase):
+    def test_label_columns(self):
+        df = pd.DataFrame({
+            'id': ['s1', 's2', 's3'],
+            'measure': [1.0, 2.0, 3.0],
+            'group': [1, 2, 1],
+            'class': ['a', 'b', 'a'],
+            'level': ['x', 'x', 'y'],
+            'subject': ['p1', 'p2', 'p1']})
+
+        obs = categorize_columns(df)
+
+        self.assertEqual(obs['id'].dtype, object)
+        self.assertEqual(obs['group'].dtype, 'int64')
+        for col in ['class', 'level', 'subject']:
+            self.assertIsInstance(obs[col].dtype, pd.CategoricalDtype)
+        self.assertEqual(obs['class'].tolist(), ['a', 'b', 'a'])
+        self.assertEqual(list(obs['subject'].cat.categories), ['p1', 'p2'])
+
+    def test_empty(self):
+        df = pd.DataFrame(columns=['id', 'measure', 'group', 'subject'])
+
+        obs = categorize_columns(df)
+
+        self.assertEqual(obs['group'].dtype, object)
+        self.assertEqual(obs['subject'].dtype, object)
+
+
+class TestTableJSONLSummary(unittest.TestCase):
+    def test_summary(self):
+        df = pd.DataFrame({
+            'id': ['s1', 's2', 's3', 's4'],
+            'measure': [1.5, float('nan'), 3.0, 1.5],
+            'group': [1, 2, 1, 10],
+            'subject': pd.Categorical(['p1', 'p2', 'p1', None])})
+
+        obs = table_jsonl_summary(df)
+
+        self.assertEqual(obs, {'rows': 4, 'columns': {
+            'id': {'nunique': 4},
+            'measure': {'nunique': 2, 'min': 1.5, 'max': 3.0},
+            'group': {'nunique': 3, 'min': 1, 'max': 10},
+            'subject': {'nunique': 2}}})
+
+    def test_empty(self):
+        df = pd.DataFrame({'id': [], 'measure': []})
+        df = df.astype({'id': object, 'measure': float})
+
+        obs = table_jsonl_summary(df)
+
+        self.assertEqual(obs, {'rows': 0, 'columns': {
+            'id': {'nunique': 0},
+            'measure': {'nunique': 0, 'min': None, 'max': None}}})
+
+    def test_unhashable(self):
+        df = pd.DataFrame({'id': ['s1', 's2'], 'tags': [['a'], ['a', 'b']]})
+
+        obs = table_jsonl_summary(df)
+
+        self.assertEqual(obs, {'rows': 2, 'columns': {
+            'id': {'nunique': 2}, 'tags': {}}})
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -9,12 +9,14 @@
 from .formats import (TableJSONLFileFormat, TableJSONLDirFmt,
                       NDJSONFileFormat, DataResourceSchemaFileFormat,
                       TabularDataResourceDirFmt)
+from ._table_jsonl import TableJSONLHeader, TableJSONLChunks
 from .types import (StatsTable, Pairwise, Dist1D, Ordered, Unordered,
                     NestedOrdered, NestedUnordered, Multi,
                     Matched, Independent)
 
 __all__ = ['TableJSONLFileFormat', 'TableJSONLDirFmt',
            'NDJSONFileFormat', 'DataResourceSchemaFileFormat',
-           'TabularDataResourceDirFmt', 'StatsTable', 'Pairwise',
-           'Dist1D', 'Ordered', 'Unordered', 'NestedOrdered',
-           'NestedUnordered', 'Multi', 'Matched', 'Independent']
+           'TabularDataResourceDirFmt', 'TableJSONLHeader',
+           'TableJSONLChunks', 'StatsTable', 'Pairwise', 'Dist1D', 'Ordered',
+           'Unordered', 'NestedOrdered', 'NestedUnordered', 'Multi',
+           'Matched', 'Independent']
@@ -6,11 +6,18 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import json
+import os
+
+import numpy as np
 import pandas as pd
 import frictionless as fls
-import json
 
 from ..formats import TableJSONLFileFormat
+from .._table_jsonl import (
+    TableJSONLHeader, TableJSONLChunks, decode_table_jsonl, encode_table_jsonl,
+    apply_table_jsonl_header)
+from ...util import table_jsonl_header, categorize_columns
 
 from .. import (NDJSONFileFormat,
                 DataResourceSchemaFileFormat,
@@ -19,96 +26,52 @@ from .. import (NDJSONFileFormat,
 from ...plugin_setup import plugin
 
 
-def table_jsonl_header(df: pd.DataFrame) -> str:
-    header = {}
-    header['doctype'] = dict(
-        name='table.jsonl', format='application/x-json-lines', version='1.0')
-    header['direction'] = 'row'
-    header['style'] = 'key:value'
-
-    fields = []
-    for name in df.columns:
-        attrs = df[name].attrs.copy()
-        title = attrs.pop('title', '')
-        description = attrs.pop('description', '')
-        type = attrs.pop('type', None)
-        missing = attrs.pop('missing', False)
-        extra = attrs.pop('extra', None)
-        if extra is None:
-            extra = attrs
-        fields.append(dict(
-            name=name, type=type, missing=missing, title=title,
-            description=description, extra=extra))
-
-    header['fields'] = fields
-    header['index'] = []
-    header['title'] = df.attrs.get('title', '')
-    header['description'] = df.attrs.get('description', '')
-    header['extra'] = df.attrs.get('extra', {})
-
-    # prevent whitespace after comma and colon
-    return json.dumps(header, separators=(',', ':'))
-
-
 @plugin.register_transformer
 def table_jsonl_to_df(ff: TableJSONLFileFormat) -> pd.DataFrame:
     with ff.open() as fh:
-        header = json.loads(next(fh))
-        df = pd.read_json(fh, lines=True, orient='records')
-        if df.empty:
-            df = pd.DataFrame(columns=[
-                spec['name'] for spec in header['fields']])
-
-    # The order of these steps matters.
-
-    # 1. set order of columns
-    df = df[[spec['name'] for spec in header['fields']]]
-
-    # 2. update types
-    for spec in header['fields']:
-        col = spec['name']
-        if spec['type'] == 'integer':
-            df[col] = df[col].astype('int64')
-        elif spec['type'] == 'number':
-            df[col] = df[col].astype('float64')
-        elif spec['type'] == 'datetime':
-            df[col] = pd.to_datetime(df[col], format='iso8601')
-        elif spec['type'] == 'date':
-            df[col] = pd.to_datetime(df[col], format='iso8601')
-        elif spec['type'] == 'time':
-            df[col] = pd.to_datetime(df[col], format='mixed').dt.time
-        elif spec['type'] == 'duration':
-            df[col] = pd.to_timedelta(df[col])
-
-    # 3. set index
-    if len(header['index']) > 0:
-        df = df.set_index(header['index'], drop=False)
-
-    # 4. add metadata to columns
-    for spec in header['fields']:
-        df[spec['name']].attrs.update(spec)
-
-    # 5. add metadata to table
-    attrs = dict(title=header['title'], description=header['description'])
-    df.attrs.update(attrs)
-
-    return df
+        return _read_table_jsonl(fh)
 
 
 @plugin.register_transformer
-def df_to_table_jsonl(obj: pd.DataFrame) -> TableJSONLFileFormat:
-    header = table_jsonl_header(obj)
+def table_jsonl_to_header(ff: TableJSONLFileFormat) -> TableJSONLHeader:
+    return TableJSONLHeader(str(ff))
 
+
+@plugin.register_transformer
+def table_jsonl_to_chunks(ff: TableJSONLFileFormat) -> TableJSONLChunks:
+    return TableJSONLChunks(str(ff))
+
+
+@plugin.register_transformer
+def df_to_table_jsonl(obj: pd.DataFrame) -> TableJSONLFileFormat:
     ff = TableJSONLFileFormat()
     with ff.open() as fh:
-        fh.write(header)
-        fh.write('\n')
-        if not obj.empty:
-            obj.to_json(fh, orient='records', lines=True, date_format='iso')
+        _write_table_jsonl(obj, fh)
 
     return ff
 
 
+def _write_summary():
+    # Whether to store a row summary (see `q2_stats.util.table_jsonl_summary`)
+    # in the header of a table.jsonl written from a DataFrame. Off by
+    # default, as it costs a full pass over every column.
+    value = os.environ.get('Q2_STATS_TABLE_JSONL_SUMMARY', '')
+    return value.strip().lower() in ('1', 'true', 'yes')
+
+
+def _read_table_jsonl(fh):
+    header = json.loads(next(fh))
+    df = decode_table_jsonl(fh, header['fields'])
+
+    return apply_table_jsonl_header(df, header)
+
+
+def _write_table_jsonl(obj, fh):
+    fh.write(table_jsonl_header(obj, summary=_write_summary()))
+    fh.write('\n')
+    encode_table_jsonl(obj, fh)
+
+
 @plugin.register_transformer
 def _1(obj: pd.DataFrame) -> NDJSONFileFormat:
     ff = NDJSONFileFormat()
@@ -123,16 +86,15 @@ def _2(obj: DataResourceSchemaFileFormat) -> fls.Resource:
 
 @plugin.register_transformer
 def _3(df: TabularDataResourceDirFmt) -> pd.DataFrame:
-    path = df.data.view(NDJSONFileFormat)
-    data = pd.read_json(str(path), lines=True)
-    resource = df.metadata.view(fls.Resource)
+    with open(df.path / 'dataresource.json') as fh:
+        fields = json.load(fh)['schema']['fields']
 
-    if data.empty:
-        data = pd.DataFrame(
-            columns=[c.name for c in resource.schema.fields])
+    with open(df.path / 'data.ndjson') as fh:
+        data = decode_table_jsonl(fh, fields)
 
-    for field in resource.schema.fields:
-        data[field.name].attrs = field.to_dict()
+    data = categorize_columns(data)
+    for field in fields:
+        data[field['name']].attrs = dict(field)
 
     return data
 
@@ -142,19 +104,9 @@ def _4(obj: pd.DataFrame) -> TabularDataResourceDirFmt:
     metadata_obj = []
 
     for col in obj.columns:
-        series = obj[col]
-        dtype = series.convert_dtypes().dtype
-        metadata = series.attrs.copy()
-
-        if pd.api.types.is_float_dtype(dtype):
-            schema_dtype = 'number'
-        elif pd.api.types.is_integer_dtype(dtype):
-            schema_dtype = 'integer'
-        else:
-            schema_dtype = 'string'
-
+        metadata = obj[col].attrs.copy()
         metadata['name'] = col
-        metadata['type'] = schema_dtype
+        metadata['type'] = _schema_type(obj[col])
 
         metadata_obj.append(metadata)
 
@@ -170,3 +122,38 @@ def _4(obj: pd.DataFrame) -> TabularDataResourceDirFmt:
         fh.write(json.dumps(metadata_dict, indent=4))
 
     return dir_fmt
+
+
+def _schema_type(series):
+    # The schema type of the dtype `series.convert_dtypes()` would pick,
+    # without converting the column: floats that are all whole numbers
+    # (or missing) count as integers, and anything not numeric is a string.
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'string'
+    elif pd.api.types.is_integer_dtype(dtype):
+        return 'integer'
+    elif pd.api.types.is_float_dtype(dtype):
+        if not isinstance(dtype, np.dtype):
+            # nullable floats are left as they are
+            return 'number'
+    elif dtype == object:
+        kind = pd.api.types.infer_dtype(series, skipna=True)
+        if kind == 'integer':
+            return 'integer'
+        elif kind == 'empty':
+            # only missing values, which are integers if any is a NaN
+            if any(isinstance(value, float) for value in series):
+                return 'integer'
+            return 'string'
+        elif kind not in ('floating', 'mixed-integer-float'):
+            return 'string'
+    else:
+        return 'string'
+
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    values = values[~np.isnan(values)]
+    whole = ((values == np.floor(values))
+             & (values >= -2.0 ** 63) & (values < 2.0 ** 63))
+
+    return 'integer' if whole.all() else 'number'
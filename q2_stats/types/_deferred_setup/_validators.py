@@ -6,6 +6,9 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import itertools
+
+import numpy as np
 import pandas as pd
 
 from qiime2.plugin import ValidationError
@@ -14,6 +17,12 @@ from .. import (Dist1D, Ordered, Unordered, NestedOrdered,
 from ...plugin_setup import plugin
 
 
+# leading rows whose subjects are checked by 'min' validation
+_SAMPLE_SUBJECTS = 100
+# groups listed in the error for duplicated subjects
+_MAX_REPORTED_GROUPS = 20
+
+
 @plugin.register_validator(Dist1D[Ordered | Unordered,
                            Matched | Independent])
 def validate_all_dist_columns_present(data: pd.DataFrame, level):
@@ -25,16 +34,7 @@ def validate_all_dist_columns_present(data: pd.DataFrame, level):
 
 @plugin.register_validator(Dist1D[Ordered | Unordered, Matched])
 def validate_unique_subjects_within_group(data: pd.DataFrame, level):
-    if 'subject' not in data.columns:
-        raise ValidationError('"subject" not found in distribution.')
-
-    for group_id, group_df in data.groupby('group'):
-        if group_df['subject'].duplicated().any():
-            dupes = list(group_df['subject'][group_df['subject'].duplicated()])
-            raise ValidationError(
-                'Unique subject found more than once within an individual'
-                ' group. Group(s) where duplicated subject was found:'
-                f' [{group_id}] Duplicated subjects: {dupes}')
+    _validate_unique_subjects(data, ['group'], level)
 
 
 @plugin.register_validator(Dist1D[NestedOrdered | NestedUnordered,
@@ -44,3 +44,101 @@ def validate_all_nesteddist_columns_present(data: pd.DataFrame, level):
     for col in req_cols:
         if col not in data.columns:
             raise ValidationError(f'"{col}" not found in distribution.')
+
+
+@plugin.register_validator(Dist1D[NestedOrdered | NestedUnordered, Matched])
+def validate_unique_subjects_within_nested_group(data: pd.DataFrame, level):
+    _validate_unique_subjects(data, ['class', 'level', 'group'], level)
+
+
+def _validate_unique_subjects(data, by, level):
+    for col in by + ['subject']:
+        if col not in data.columns:
+            raise ValidationError(f'"{col}" not found in distribution.')
+
+    sample = _SAMPLE_SUBJECTS if level == 'min' else None
+    dupes = _duplicated_subjects(data, by, sample=sample)
+    if dupes:
+        shown = dict(itertools.islice(dupes.items(), _MAX_REPORTED_GROUPS))
+        more = len(dupes) - len(shown)
+        name = by[0] if len(by) == 1 else '(%s)' % ', '.join(by)
+        raise ValidationError(
+            'Unique subject found more than once within an individual'
+            f' {name}. Group(s) where duplicated subject was found:'
+            f' {list(shown)} Duplicated subjects: {shown}'
+            + (f' (and {more} more group(s))' if more else ''))
+
+
+def _duplicated_subjects(data, by, sample=None):
+    """Map each group of the `by` columns to its repeated subjects.
+
+    Groups are keyed by their label, or by a tuple of labels for several
+    `by` columns. Rows missing any `by` value are ignored, while a missing
+    subject counts as a subject of its own. Every column is reduced to
+    integer codes (free for the categorical columns read from a
+    table.jsonl) and combined into a single key, so duplicates are found
+    in one pass over an integer array instead of per group.
+
+    With `sample`, only the rows of the subjects in the first `sample`
+    rows are checked. All of their rows are, so any duplicate of one of
+    those subjects is still found.
+    """
+    subject = data['subject']
+    if sample is not None and not isinstance(subject.dtype,
+                                             pd.CategoricalDtype):
+        # factorizing is most of the work for these, so narrow them first
+        data = data[subject.isin(subject.iloc[:sample].unique()).to_numpy()]
+
+    keys, cardinality = _factorize(data[by[0]])
+    keep = keys >= 0
+    for col in by[1:] + ['subject']:
+        codes, n = _factorize(data[col])
+        if col == 'subject':
+            # a missing subject is kept as a code of its own
+            codes += 1
+            n += 1
+        else:
+            keep &= codes >= 0
+        if cardinality * n >= 2 ** 62:
+            keys, uniques = pd.factorize(keys)
+            cardinality = len(uniques)
+        keys *= n
+        keys += codes
+        cardinality *= n
+
+    if sample is not None:
+        sampled = np.zeros(n, dtype=bool)
+        sampled[codes[:sample]] = True
+        keep &= sampled[codes]
+    if not keep.all():
+        keys = keys[keep]
+
+    if cardinality <= 4 * len(keys):
+        dupes = np.flatnonzero(np.bincount(keys, minlength=cardinality) > 1)
+    else:
+        ordered = np.sort(keys)
+        dupes = np.unique(ordered[1:][ordered[1:] == ordered[:-1]])
+
+    if not len(dupes):
+        return {}
+
+    # labels are only looked up for the offending rows
+    rows = np.flatnonzero(keep)[np.isin(keys, dupes)]
+    offending = data.iloc[rows][by + ['subject']].drop_duplicates()
+    pairs = {}
+    for *group, subject in zip(*(offending[col].astype(object).tolist()
+                                 for col in by + ['subject'])):
+        group = group[0] if len(by) == 1 else tuple(group)
+        pairs.setdefault(group, []).append(subject)
+
+    return pairs
+
+
+def _factorize(series):
+    # codes of `series`, -1 where missing, and the number of distinct codes
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return (series.cat.codes.to_numpy(dtype=np.int64),
+                len(series.cat.categories))
+
+    codes, uniques = pd.factorize(series)
+    return codes.astype(np.int64), len(uniques)
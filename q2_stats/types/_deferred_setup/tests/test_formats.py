@@ -0,0 +1,126 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2024, QIIME 2 development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest.mock
+
+from qiime2.plugin import ValidationError
+from qiime2.plugin.testing import TestPluginBase
+
+from ... import formats
+from .. import TabularDataResourceDirFmt
+
+
+class TestTabularDataResourceDirFmt(TestPluginBase):
+    package = 'q2_stats.tests'
+
+    UUID = '6d2a4ab4-56d5-4d3f-9a6b-d2fa5ff3b0b1'
+
+    def setUp(self):
+        super().setUp()
+        self.validated = formats.ValidatedArtifacts()
+        patcher = unittest.mock.patch.object(
+            formats, 'VALIDATED_ARTIFACTS', self.validated)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _artifact(self, bad_line=None):
+        # lay out the data directory of an artifact the way it is extracted
+        root = os.path.join(self.temp_dir.name, 'artifact')
+        data = os.path.join(root, 'data')
+        shutil.copytree(self.get_data_path('faithpd_timedist'), data)
+        with open(os.path.join(root, 'metadata.yaml'), 'w') as fh:
+            fh.write('uuid: %s\ntype: Dist1D[Ordered, Matched]\n'
+                     'format: TabularDataResourceDirFmt\n' % self.UUID)
+
+        if bad_line is not None:
+            path = os.path.join(data, 'data.ndjson')
+            with open(path) as fh:
+                lines = fh.readlines()
+            lines = lines * (bad_line // len(lines) + 1)
+            lines[bad_line - 1] = '{"id": \n'
+            with open(path, 'w') as fh:
+                fh.writelines(lines)
+
+        return data
+
+    def test_validate(self):
+        for name in ['faithpd_timedist', 'faithpd_refdist',
+                     'empty_data_dist']:
+            fmt = TabularDataResourceDirFmt(self.get_data_path(name),
+                                            mode='r')
+            fmt.validate(level='min')
+            fmt.validate(level='max')
+
+    def test_min_checks_a_sample_of_rows(self):
+        fmt = TabularDataResourceDirFmt(self._artifact(bad_line=500),
+                                        mode='r')
+
+        fmt.validate(level='min')
+        with self.assertRaisesRegex(ValidationError, 'Line 500'):
+            fmt.validate(level='max')
+        self.assertEqual(len(self.validated), 0)
+
+    def test_bad_schema(self):
+        data = self._artifact()
+        with open(os.path.join(data, 'dataresource.json'), 'w') as fh:
+            fh.write('{"schema": {"fields": [{"type": "string"}]}}')
+
+        fmt = TabularDataResourceDirFmt(data, mode='r')
+
+        with self.assertRaisesRegex(ValidationError, 'named fields'):
+            fmt.validate(level='min')
+
+    def _count_scans(self):
+        return unittest.mock.patch.object(
+            TabularDataResourceDirFmt, '_validate_rows', autospec=True,
+            side_effect=TabularDataResourceDirFmt._validate_rows)
+
+    def test_max_is_cached_per_artifact(self):
+        fmt = TabularDataResourceDirFmt(self._artifact(), mode='r')
+
+        with self._count_scans() as scan:
+            fmt.validate(level='max')
+            fmt.validate(level='max')
+
+        self.assertEqual(scan.call_count, 1)
+        self.assertEqual(len(self.validated), 1)
+        self.assertIn(fmt._cache_key(), self.validated)
+        self.assertTrue(fmt._cache_key().startswith(self.UUID))
+
+    def test_max_rescans_changed_data(self):
+        data = self._artifact()
+        fmt = TabularDataResourceDirFmt(data, mode='r')
+        fmt.validate(level='max')
+
+        path = os.path.join(data, 'data.ndjson')
+        with open(path, 'a') as fh:
+            fh.write('{"id": \n')
+
+        with self._count_scans() as scan:
+            with self.assertRaisesRegex(ValidationError, 'Line'):
+                fmt.validate(level='max')
+
+        self.assertEqual(scan.call_count, 1)
+        self.assertEqual(len(self.validated), 1)
+
+    def test_max_cache_persisted_to_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.validated.directory = tmp
+            fmt = TabularDataResourceDirFmt(self._artifact(), mode='r')
+            fmt.validate(level='max')
+
+            fresh = formats.ValidatedArtifacts(directory=tmp)
+
+            self.assertIn(fmt._cache_key(), fresh)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,12 +6,19 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import io
+import json
+import unittest.mock
+
 import pandas as pd
 
 from qiime2.plugin.testing import TestPluginBase
 from qiime2.plugin.util import transform
 
 from .. import TabularDataResourceDirFmt, TableJSONLFileFormat
+from ... import TableJSONLHeader, TableJSONLChunks
+from ..._table_jsonl import decode_table_jsonl, encode_table_jsonl
+from ....util import table_jsonl_header
 
 
 class TestTransformers(TestPluginBase):
@@ -26,6 +33,43 @@ class TestTransformers(TestPluginBase):
 
         pd.testing.assert_frame_equal(obs, exp, check_dtype=False)
 
+    def test_tabular_data_resource_to_dataframe(self):
+        fmt, obs = self.transform_format(TabularDataResourceDirFmt,
+                                         pd.DataFrame,
+                                         filename='faithpd_timedist')
+
+        with open(fmt.path / 'dataresource.json') as fh:
+            fields = json.load(fh)['schema']['fields']
+
+        self.assertEqual(list(obs.columns), [f['name'] for f in fields])
+        self.assertEqual(obs['measure'].dtype, float)
+        self.assertEqual(obs['group'].dtype, int)
+        self.assertIsInstance(obs['subject'].dtype, pd.CategoricalDtype)
+        for field in fields:
+            self.assertEqual(obs[field['name']].attrs, field)
+
+    def test_dataframe_to_tabular_data_resource_types(self):
+        nan = float('nan')
+        df = pd.DataFrame({
+            'id': ['S1', 'S2', 'S3'],
+            'measure': [0.5, 1.0, nan],
+            'whole': [1.0, 2.0, nan],
+            'group': [1, 2, 3],
+            'flag': [True, False, True],
+            'mixed': [1, 2.5, None],
+            'missing': [None, None, None],
+            'subject': pd.Categorical(['a', 'b', 'a'])})
+
+        fmt = transform(df, to_type=TabularDataResourceDirFmt)
+
+        with open(fmt.path / 'dataresource.json') as fh:
+            fields = json.load(fh)['schema']['fields']
+        obs = {f['name']: f['type'] for f in fields}
+        exp = {'id': 'string', 'measure': 'number', 'whole': 'integer',
+               'group': 'integer', 'flag': 'string', 'mixed': 'number',
+               'missing': 'string', 'subject': 'string'}
+        self.assertEqual(obs, exp)
+
     def test_empty_table_jsonl_to_dataframe(self):
         _, obs = self.transform_format(TableJSONLFileFormat,
                                        pd.DataFrame,
@@ -35,6 +79,170 @@ class TestTransformers(TestPluginBase):
 
         pd.testing.assert_frame_equal(obs, exp, check_dtype=False)
 
+    def test_table_jsonl_to_dataframe_categorical_labels(self):
+        _, obs = self.transform_format(TableJSONLFileFormat,
+                                       pd.DataFrame,
+                                       filename='faithpd_refdist.table.jsonl')
+
+        self.assertIsInstance(obs['group'].dtype, pd.CategoricalDtype)
+        self.assertEqual(list(obs['group'].cat.categories),
+                         ['control', 'reference'])
+        self.assertEqual(obs['group'].attrs['title'], 'InitialDonorSampleID')
+        self.assertEqual(obs['id'].dtype, object)
+
+    def test_table_jsonl_to_header(self):
+        _, df = self.transform_format(
+            TableJSONLFileFormat, pd.DataFrame,
+            filename='faithpd_timedist.table.jsonl')
+        _, obs = self.transform_format(
+            TableJSONLFileFormat, TableJSONLHeader,
+            filename='faithpd_timedist.table.jsonl')
+
+        self.assertEqual(obs.columns, list(df.columns))
+        self.assertEqual(obs.attrs, df.attrs)
+        for name in df.columns:
+            self.assertEqual(obs.column_attrs(name), df[name].attrs)
+        self.assertIsNone(obs.summary)
+        self.assertIsNone(obs.column_summary('measure'))
+        self.assertEqual(obs.n_rows, 87)
+
+    def test_table_jsonl_header_with_summary(self):
+        _, df = self.transform_format(
+            TableJSONLFileFormat, pd.DataFrame,
+            filename='faithpd_timedist.table.jsonl')
+        ff = TableJSONLFileFormat()
+        with ff.open() as fh:
+            fh.write(table_jsonl_header(df, summary=True))
+            fh.write('\n')
+            encode_table_jsonl(df, fh)
+
+        obs = transform(ff, to_type=TableJSONLHeader)
+
+        self.assertEqual(obs.n_rows, 87)
+        self.assertEqual(obs.column_summary('group'),
+                         {'nunique': 5, 'min': 0, 'max': 100})
+        self.assertEqual(obs.column_summary('subject'), {'nunique': 18})
+        with self.assertRaises(KeyError):
+            obs.column_summary('class')
+
+    def test_df_to_table_jsonl_summary_setting(self):
+        _, df = self.transform_format(
+            TableJSONLFileFormat, pd.DataFrame,
+            filename='faithpd_timedist.table.jsonl')
+
+        for value, written in [('1', True), ('true', True), ('Yes', True),
+                               ('0', False), ('false', False), ('', False)]:
+            with unittest.mock.patch.dict(
+                    'os.environ', {'Q2_STATS_TABLE_JSONL_SUMMARY': value}):
+                ff = transform(df, to_type=TableJSONLFileFormat)
+
+            obs = transform(ff, to_type=TableJSONLHeader)
+            self.assertEqual(obs.summary is not None, written, value)
+
+    def test_table_jsonl_to_chunks(self):
+        _, full = self.transform_format(
+            TableJSONLFileFormat, pd.DataFrame,
+            filename='faithpd_timedist.table.jsonl')
+        _, obs = self.transform_format(
+            TableJSONLFileFormat, TableJSONLChunks,
+            filename='faithpd_timedist.table.jsonl')
+
+        chunks = list(obs.iter_chunks(7))
+
+        self.assertEqual([len(chunk) for chunk in chunks[:-1]],
+                         [7] * (len(chunks) - 1))
+        self.assertEqual(sum(len(chunk) for chunk in chunks), len(full))
+        for chunk in chunks:
+            self.assertEqual(chunk.attrs, full.attrs)
+            self.assertEqual(chunk['measure'].attrs, full['measure'].attrs)
+        pd.testing.assert_frame_equal(
+            pd.concat(chunks).astype(object), full.astype(object))
+
+    def test_table_jsonl_to_chunks_empty(self):
+        _, obs = self.transform_format(
+            TableJSONLFileFormat, TableJSONLChunks,
+            filename='empty_data_dist.table.jsonl')
+
+        self.assertEqual(list(obs), [])
+        self.assertEqual(obs.header['doctype']['name'], 'table.jsonl')
+
+    def test_table_jsonl_chunks_columns(self):
+        path = self.get_data_path('faithpd_timedist.table.jsonl')
+        full = pd.concat(TableJSONLChunks(path))
+
+        obs = pd.concat(TableJSONLChunks(path, columns=['measure', 'id']))
+
+        self.assertEqual(list(obs.columns), ['id', 'measure'])
+        self.assertEqual(obs['measure'].attrs, full['measure'].attrs)
+        pd.testing.assert_series_equal(obs['measure'], full['measure'])
+
+        with self.assertRaises(KeyError):
+            next(iter(TableJSONLChunks(path, columns=['nope'])))
+
+    def test_table_jsonl_chunks_invalid_chunksize(self):
+        obs = TableJSONLChunks(
+            self.get_data_path('faithpd_timedist.table.jsonl'))
+
+        with self.assertRaisesRegex(ValueError, 'chunksize'):
+            next(obs.iter_chunks(0))
+
+    def test_decode_table_jsonl_typed(self):
+        records = io.StringIO(
+            '{"id":"S1","measure":1,"n":2,"subject":"007"}\n'
+            '\n'
+            '{"id":"S2","measure":2.5,"n":3,"subject":"008"}\n')
+        fields = [{'name': 'id', 'type': 'string'},
+                  {'name': 'measure', 'type': 'number'},
+                  {'name': 'n', 'type': 'integer'},
+                  {'name': 'subject', 'type': 'string'}]
+
+        obs = decode_table_jsonl(records, fields)
+
+        exp = pd.DataFrame({'id': ['S1', 'S2'], 'measure': [1.0, 2.5],
+                            'n': [2, 3], 'subject': ['007', '008']})
+        pd.testing.assert_frame_equal(obs, exp)
+
+    def test_decode_table_jsonl_missing_integer(self):
+        records = io.StringIO('{"group":1}\n{"group":null}\n')
+
+        obs = decode_table_jsonl(records, [{'name': 'group',
+                                            'type': 'integer'}])
+
+        exp = pd.DataFrame({'group': [1.0, float('nan')]})
+        pd.testing.assert_frame_equal(obs, exp)
+
+    def test_decode_table_jsonl_untyped(self):
+        records = io.StringIO(
+            '{"A:group":"1","test-statistic":77.0,"p-value":null}\n'
+            '{"A:group":"2","test-statistic":80.0,"p-value":0.5}\n')
+        fields = [{'name': 'A:group', 'type': None},
+                  {'name': 'test-statistic', 'type': None},
+                  {'name': 'p-value', 'type': None}]
+
+        obs = decode_table_jsonl(records, fields)
+
+        exp = pd.read_json(io.StringIO(records.getvalue()), lines=True)
+        pd.testing.assert_frame_equal(obs, exp)
+
+    def test_encode_table_jsonl(self):
+        df = pd.DataFrame({'id': ['S/1', 'S"2', 'S,3', None, 'S4'],
+                           'measure': [1.0, 1 / 3, 1e17, float('nan'), 0.0],
+                           'group': pd.Categorical(['a', 'b', 'a', None, 'b']),
+                           'n': [1, 2, 3, 4, 5]})
+        exp = df.to_json(orient='records', lines=True, date_format='iso')
+
+        for params in [{}, {'chunksize': 2}]:
+            fh = io.StringIO()
+            encode_table_jsonl(df, fh, **params)
+
+            self.assertEqual(fh.getvalue(), exp)
+
+    def test_encode_table_jsonl_empty(self):
+        fh = io.StringIO()
+        encode_table_jsonl(pd.DataFrame(columns=['id', 'measure']), fh)
+
+        self.assertEqual(fh.getvalue(), '')
+
     def _assert_jsonl_roundtrip(self, path):
         exp, df = self.transform_format(TableJSONLFileFormat,
                                         pd.DataFrame,
@@ -14,7 +14,8 @@ from qiime2.plugin import ValidationError
 
 from .._validators import (
     validate_all_dist_columns_present,
-    validate_unique_subjects_within_group)
+    validate_unique_subjects_within_group,
+    validate_unique_subjects_within_nested_group)
 
 
 class TestValidators(unittest.TestCase):
@@ -38,3 +39,100 @@ class TestValidators(unittest.TestCase):
                 'subject': ['P26', 'P26']
             })
             validate_unique_subjects_within_group(df, level=min)
+
+    def test_validators_unique_subjects_reports_all_groups(self):
+        df = pd.DataFrame({
+            'id': ['S1', 'S2', 'S3', 'S4', 'S5', 'S6', 'S7'],
+            'measure': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0],
+            'group': [0, 0, 0, 1, 1, 2, 2],
+            'subject': ['P1', 'P2', 'P1', 'P1', 'P2', 'P3', 'P3']
+        })
+
+        for data in [df, df.astype({'group': 'category',
+                                    'subject': 'category'})]:
+            with self.assertRaisesRegex(
+                    ValidationError,
+                    r"\[0, 2\] Duplicated subjects: "
+                    r"\{0: \['P1'\], 2: \['P3'\]\}"):
+                validate_unique_subjects_within_group(data, level='max')
+
+    def test_validators_unique_subjects_same_subject_across_groups(self):
+        df = pd.DataFrame({
+            'id': ['S1', 'S2', 'S3', 'S4'],
+            'measure': [1.0, 2.0, 3.0, 4.0],
+            'group': [0, 0, 1, 1],
+            'subject': ['P1', 'P2', 'P1', 'P2']
+        })
+
+        validate_unique_subjects_within_group(df, level='max')
+
+    def test_validators_unique_subjects_min_samples_subjects(self):
+        n = 1000
+        df = pd.DataFrame({
+            'id': ['S%d' % i for i in range(n + 1)],
+            'measure': [1.0] * (n + 1),
+            'group': [0] * (n + 1),
+            'subject': ['P%d' % i for i in range(n)] + ['P%d' % (n - 1)]
+        })
+
+        validate_unique_subjects_within_group(df, level='min')
+        with self.assertRaisesRegex(ValidationError, 'P999'):
+            validate_unique_subjects_within_group(df, level='max')
+
+        # a duplicate of a sampled subject is found wherever it is
+        df.loc[n, 'subject'] = 'P0'
+        with self.assertRaisesRegex(ValidationError, 'P0'):
+            validate_unique_subjects_within_group(df, level='min')
+
+    def _nested_dist(self):
+        return pd.DataFrame({
+            'id': ['S%d' % i for i in range(8)],
+            'measure': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0],
+            'class': ['gut', 'gut', 'gut', 'gut', 'oral', 'oral', 'oral',
+                      'oral'],
+            'level': ['a', 'a', 'b', 'b', 'a', 'a', 'a', 'a'],
+            'group': [0, 0, 0, 0, 0, 0, 1, 1],
+            'subject': ['P1', 'P2', 'P1', 'P2', 'P1', 'P2', 'P1', 'P2']
+        })
+
+    def test_validators_nested_unique_subjects(self):
+        df = self._nested_dist()
+
+        for level in ['min', 'max']:
+            validate_unique_subjects_within_nested_group(df, level=level)
+
+    def test_validators_nested_subjects_duplicated(self):
+        df = self._nested_dist()
+        df.loc[3, 'subject'] = 'P1'
+        df.loc[7, 'subject'] = 'P1'
+
+        for data in [df, df.astype({'class': 'category',
+                                    'level': 'category',
+                                    'subject': 'category'})]:
+            with self.assertRaisesRegex(
+                    ValidationError,
+                    r"individual \(class, level, group\).*"
+                    r"\[\('gut', 'b', 0\), \('oral', 'a', 1\)\]"):
+                validate_unique_subjects_within_nested_group(data,
+                                                             level='max')
+
+    def test_validators_nested_missing_column(self):
+        df = self._nested_dist().drop(columns='level')
+
+        with self.assertRaisesRegex(ValidationError, '"level" not found'):
+            validate_unique_subjects_within_nested_group(df, level='min')
+
+    def test_validators_nested_min_samples_subjects(self):
+        n = 1000
+        df = pd.DataFrame({
+            'id': ['S%d' % i for i in range(n + 1)],
+            'measure': [1.0] * (n + 1),
+            'class': ['gut'] * (n + 1),
+            'level': ['a'] * (n + 1),
+            'group': [0] * (n + 1),
+            'subject': ['P%d' % i for i in range(n)] + ['P%d' % (n - 1)]
+        })
+
+        validate_unique_subjects_within_nested_group(df, level='min')
+        with self.assertRaisesRegex(ValidationError, 'P999'):
+            validate_unique_subjects_within_nested_group(df, level='max')
@@ -0,0 +1,291 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2024, QIIME 2 development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import json
+import operator
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from ..util import categorize_columns
+
+
+class TableJSONLHeader:
+    """
+    The header line of a table.jsonl file, read without any of its records.
+
+    This answers questions about a table, such as its column titles and
+    attrs, without decoding its rows. When the writer stored a summary in
+    the header (see `q2_stats.util.table_jsonl_summary`), the row count and
+    the per-column min, max and number of unique values come from it as
+    well; otherwise the row count falls back to counting the record lines.
+    Tables written from a DataFrame only get a summary when the
+    Q2_STATS_TABLE_JSONL_SUMMARY environment variable is set to 1, true or
+    yes.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path) as fh:
+            self.header = json.loads(next(fh))
+
+    @property
+    def columns(self):
+        return [spec['name'] for spec in self.header['fields']]
+
+    @property
+    def attrs(self):
+        """The table attrs of the DataFrame view."""
+        return dict(title=self.header['title'],
+                    description=self.header['description'])
+
+    def column_attrs(self, name):
+        """The attrs of the column `name` in the DataFrame view."""
+        for spec in self.header['fields']:
+            if spec['name'] == name:
+                return dict(spec)
+
+        raise KeyError(name)
+
+    @property
+    def summary(self):
+        return (self.header.get('extra') or {}).get('summary')
+
+    def column_summary(self, name):
+        if name not in self.columns:
+            raise KeyError(name)
+        if self.summary is None:
+            return None
+
+        return self.summary['columns'].get(name)
+
+    @property
+    def n_rows(self):
+        if self.summary is not None:
+            return self.summary['rows']
+
+        with open(self.path, 'rb') as fh:
+            next(fh)
+            return sum(1 for line in fh if line.strip())
+
+
+class TableJSONLChunks:
+    """
+    A table.jsonl file viewed as an iterator of DataFrame chunks.
+
+    Each chunk holds up to `chunksize` rows and is decoded the same way as
+    the full DataFrame view, with the column and table attrs from the
+    header already applied, so a table larger than memory can be processed
+    a chunk at a time. Rows keep their position in the whole table as their
+    index. Iterating again re-reads the file from the start.
+    Untyped fields are inferred per chunk, so their dtype may differ
+    between chunks. With `columns`, only those fields are decoded.
+    """
+
+    def __init__(self, path, chunksize=65536, columns=None):
+        self.path = str(path)
+        self.chunksize = chunksize
+        self.columns = columns
+
+    @property
+    def header(self):
+        with open(self.path) as fh:
+            return json.loads(next(fh))
+
+    def __iter__(self):
+        return self.iter_chunks(self.chunksize)
+
+    def iter_chunks(self, chunksize):
+        if chunksize < 1:
+            raise ValueError('`chunksize` must be a positive number of rows.')
+
+        with open(self.path) as fh:
+            header = _select_fields(json.loads(next(fh)), self.columns)
+            start = 0
+            while True:
+                lines = list(itertools.islice(fh, chunksize))
+                if not lines:
+                    return
+
+                df = decode_table_jsonl(lines, header['fields'])
+                if df.empty:
+                    continue
+
+                # number rows by their position in the whole table
+                df.index = pd.RangeIndex(start, start + len(df))
+                start += len(df)
+                yield apply_table_jsonl_header(df, header)
+
+
+def _select_fields(header, columns):
+    # the header of the table.jsonl file with only the fields `columns`
+    if columns is None:
+        return header
+
+    names = [spec['name'] for spec in header['fields']]
+    for name in columns:
+        if name not in names:
+            raise KeyError(name)
+
+    return dict(header,
+                fields=[spec for spec in header['fields']
+                        if spec['name'] in columns],
+                index=[name for name in header['index'] if name in columns])
+
+
+def apply_table_jsonl_header(df, header):
+    """
+    Finish decoding the DataFrame `df` of table.jsonl records by applying
+    the rest of the `header`: temporal types, label categoricals, index and
+    attrs.
+    """
+    # The order of these steps matters.
+
+    # 1. decode temporal types
+    for spec in header['fields']:
+        col = spec['name']
+        if spec['type'] == 'datetime':
+            df[col] = pd.to_datetime(df[col], format='iso8601')
+        elif spec['type'] == 'date':
+            df[col] = pd.to_datetime(df[col], format='iso8601')
+        elif spec['type'] == 'time':
+            df[col] = pd.to_datetime(df[col], format='mixed').dt.time
+        elif spec['type'] == 'duration':
+            df[col] = pd.to_timedelta(df[col])
+
+    # 2. store label columns as categoricals
+    df = categorize_columns(df)
+
+    # 3. set index
+    if len(header['index']) > 0:
+        df = df.set_index(header['index'], drop=False)
+
+    # 4. add metadata to columns
+    for spec in header['fields']:
+        df[spec['name']].attrs.update(spec)
+
+    # 5. add metadata to table
+    attrs = dict(title=header['title'], description=header['description'])
+    df.attrs.update(attrs)
+
+    return df
+
+
+# table.jsonl field types that decode straight into a NumPy dtype
+_FIELD_DTYPES = {'integer': 'int64', 'number': 'float64'}
+
+# table.jsonl field types that are kept as the decoded JSON values
+_OBJECT_FIELDS = {'string', 'datetime', 'date', 'time', 'duration'}
+
+# rows parsed at a time, which bounds the number of row dicts alive at once
+_DECODE_CHUNKSIZE = 65536
+
+
+def decode_table_jsonl(lines, fields):
+    """
+    Decode the record `lines` of a table.jsonl file (those after its header
+    line) into a DataFrame with the columns and types given by the header
+    `fields`.
+
+    Rows are parsed a chunk at a time and split into per-column buffers,
+    which are then turned into one array per column of the field's dtype.
+    String and temporal fields keep their JSON values as they are; fields
+    without a usable type are inferred the same way `pd.read_json` would.
+    """
+    lines = iter(lines)
+    names = [spec['name'] for spec in fields]
+    buffers = {name: [] for name in names}
+    for rows in _iter_record_chunks(lines):
+        for name in names:
+            try:
+                values = list(map(operator.itemgetter(name), rows))
+            except KeyError:
+                # a row without this field, which is missing data
+                values = [row.get(name) for row in rows]
+            buffers[name].extend(values)
+
+    columns = {}
+    for spec in fields:
+        values = buffers.pop(spec['name'])
+        if spec['type'] in _FIELD_DTYPES:
+            try:
+                column = np.array(values, dtype=_FIELD_DTYPES[spec['type']])
+            except TypeError:
+                # missing values in an integer field
+                column = _infer_column(values)
+        elif spec['type'] in _OBJECT_FIELDS or not values:
+            column = np.array(values, dtype=object)
+        else:
+            column = _infer_column(values)
+        columns[spec['name']] = column
+
+    return pd.DataFrame(columns, columns=names)
+
+
+def _iter_record_chunks(lines, chunksize=_DECODE_CHUNKSIZE):
+    while True:
+        chunk = list(itertools.islice(lines, chunksize))
+        if not chunk:
+            return
+
+        records = [line for line in chunk if line.strip()]
+        if records:
+            yield json.loads('[' + ','.join(records) + ']')
+
+
+def _infer_column(values):
+    # Mirrors the dtype inference of pd.read_json: numeric-looking values
+    # become float64, and floats that are all integral become int64.
+    data = pd.Series(values)
+    if data.dtype == object:
+        try:
+            data = data.astype('float64')
+        except (TypeError, ValueError):
+            pass
+
+    if data.dtype.kind in 'fO':
+        try:
+            as_int = data.astype('int64')
+            if (as_int == data).all():
+                data = as_int
+        except (TypeError, ValueError, OverflowError):
+            pass
+
+    return data.to_numpy()
+
+
+# rows serialized at a time when encoding
+_ENCODE_CHUNKSIZE = 65536
+
+
+def encode_table_jsonl(df, fh, chunksize=_ENCODE_CHUNKSIZE):
+    """
+    Write the rows of the DataFrame `df` to the text handle `fh` as
+    table.jsonl records (the lines after the header).
+
+    Rows are serialized a block of `chunksize` at a time and written as
+    each block is done, so only one block of text is held in memory rather
+    than the whole table. The output is byte-identical to a single
+    `df.to_json` call.
+    """
+    if chunksize < 1:
+        raise ValueError('`chunksize` must be a positive number of rows.')
+
+    if df.empty:
+        return
+
+    for start in range(0, len(df), chunksize):
+        fh.write(_encode_rows(df.iloc[start:start + chunksize]))
+
+
+def _encode_rows(df):
+    records = df.to_json(orient='records', lines=True, date_format='iso')
+
+    # blocks are written back to back, so each must end its last record
+    return records if records.endswith('\n') else records + '\n'
@@ -6,9 +6,13 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
-from qiime2.plugin import ValidationError, model
+import os
+import json
+import itertools
+import threading
+from uuid import UUID
 
-from frictionless import validate
+from qiime2.plugin import ValidationError, model
 
 
 class TableJSONLFileFormat(model.TextFileFormat):
@@ -35,15 +39,130 @@ class DataResourceSchemaFileFormat(model.TextFileFormat):
         pass
 
 
+# rows of data.ndjson checked by 'min' validation
+_SAMPLE_ROWS = 100
+
+
 class TabularDataResourceDirFmt(model.DirectoryFormat):
     data = model.File('data.ndjson', format=NDJSONFileFormat)
     metadata = model.File('dataresource.json',
                           format=DataResourceSchemaFileFormat)
 
     def _validate_(self, level='min'):
+        self._validate_schema()
+        if level == 'min':
+            self._validate_rows(limit=_SAMPLE_ROWS)
+            return
+
+        # the data of an artifact never changes, so it only needs to be
+        # scanned once per UUID, as long as data.ndjson is the same file
+        key = self._cache_key()
+        if key is not None and key in VALIDATED_ARTIFACTS:
+            return
+
+        self._validate_rows()
+
+        if key is not None:
+            VALIDATED_ARTIFACTS.add(key)
+
+    def _validate_schema(self):
         try:
-            validate(str(self.path/'dataresource.json'))
-        except ValidationError:
-            raise model.ValidationError(
-                'The dataresource does not completely describe'
-                ' the data.ndjson file')
+            with open(self.path/'dataresource.json') as fh:
+                fields = json.load(fh)['schema']['fields']
+            named = all('name' in field for field in fields)
+        except (ValueError, KeyError, TypeError):
+            named = False
+
+        if not named:
+            raise ValidationError(
+                'dataresource.json does not describe a schema of named'
+                ' fields.')
+
+    def _validate_rows(self, limit=None):
+        with open(self.path/'data.ndjson') as fh:
+            for lineno, line in enumerate(itertools.islice(fh, limit), 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                if not isinstance(row, dict):
+                    raise ValidationError(
+                        'Line %d of data.ndjson is not a JSON object.'
+                        % lineno)
+
+    def _cache_key(self):
+        # The UUID alone would also match the extracted data of an artifact
+        # that was edited before being imported again.
+        uuid = self._artifact_uuid()
+        if uuid is None:
+            return None
+
+        try:
+            stat = os.stat(self.path/'data.ndjson')
+        except OSError:
+            return None
+
+        return '%s-%d-%d' % (uuid, stat.st_size, stat.st_mtime_ns)
+
+    def _artifact_uuid(self):
+        # An artifact's data directory sits next to its metadata.yaml,
+        # which starts with the artifact's UUID.
+        try:
+            with open(self.path.parent/'metadata.yaml') as fh:
+                for line in itertools.islice(fh, 5):
+                    if line.startswith('uuid:'):
+                        return str(UUID(line.split(':', 1)[1].strip()))
+        except (OSError, ValueError):
+            pass
+
+        return None
+
+
+class ValidatedArtifacts:
+    """
+    Set of the artifacts whose data passed 'max' validation, keyed by the
+    UUID of each artifact and the size and modification time of its data.
+
+    It lives for the whole process. When `directory` is set, keys are also
+    recorded there as empty files and reused by later processes.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+
+        self._keys = set()
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        with self._lock:
+            self._keys.add(key)
+
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            open(os.path.join(self.directory, key), 'a').close()
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._keys:
+                return True
+
+        if self.directory is not None and os.path.exists(
+                os.path.join(self.directory, key)):
+            with self._lock:
+                self._keys.add(key)
+            return True
+
+        return False
+
+    def __len__(self):
+        return len(self._keys)
+
+
+VALIDATED_ARTIFACTS = ValidatedArtifacts(
+    directory=os.environ.get('Q2_STATS_VALIDATION_CACHE_DIR'))
@@ -6,6 +6,17 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import os
+import json
+import math
+
+import pandas as pd
+
+
+# columns of a distribution that hold a small set of repeated labels
+CATEGORICAL_COLUMNS = ('group', 'class', 'level', 'subject')
+
+
 def json_replace(json_obj, **values):
     """
     Search for elements of `{"{{REPLACE_PARAM}}": "some_key"}` and replace
@@ -24,3 +35,113 @@ def json_replace(json_obj, **values):
 
     else:
         return json_obj
+
+
+def table_jsonl_field(name, attrs):
+    """
+    Build the table.jsonl header field describing a column `name` with the
+    column metadata `attrs`.
+    """
+    attrs = attrs.copy()
+    title = attrs.pop('title', '')
+    description = attrs.pop('description', '')
+    type = attrs.pop('type', None)
+    missing = attrs.pop('missing', False)
+    extra = attrs.pop('extra', None)
+    if extra is None:
+        extra = attrs
+
+    return dict(name=name, type=type, missing=missing, title=title,
+                description=description, extra=extra)
+
+
+def table_jsonl_header(df, summary=False):
+    """
+    Serialize the table.jsonl header line for the DataFrame `df`, using the
+    metadata in its `attrs` and the `attrs` of its columns. With `summary`,
+    the header's `extra` also gets a `summary` of the rows (see
+    `table_jsonl_summary`), so readers can answer questions about the
+    table from its first line.
+    """
+    header = {}
+    header['doctype'] = dict(
+        name='table.jsonl', format='application/x-json-lines', version='1.0')
+    header['direction'] = 'row'
+    header['style'] = 'key:value'
+
+    header['fields'] = [table_jsonl_field(name, df[name].attrs)
+                        for name in df.columns]
+    header['index'] = []
+    header['title'] = df.attrs.get('title', '')
+    header['description'] = df.attrs.get('description', '')
+    header['extra'] = df.attrs.get('extra', {})
+    if summary:
+        header['extra'] = {**header['extra'],
+                           'summary': table_jsonl_summary(df)}
+
+    # prevent whitespace after comma and colon
+    return json.dumps(header, separators=(',', ':'))
+
+
+def table_jsonl_summary(df):
+    """
+    Summarize the DataFrame `df` for its table.jsonl header: the number of
+    rows and, for each column, the number of unique values and, for
+    numeric columns, the min and max. Missing values are left out, as are
+    the unique counts of columns holding unhashable values such as lists.
+    """
+    columns = {}
+    for name in df.columns:
+        values = df[name].dropna()
+        column = {}
+        try:
+            column['nunique'] = int(values.nunique())
+        except TypeError:
+            pass
+        if (pd.api.types.is_numeric_dtype(values.dtype)
+                and not pd.api.types.is_bool_dtype(values.dtype)):
+            column['min'] = _json_number(values.min())
+            column['max'] = _json_number(values.max())
+        columns[name] = column
+
+    return {'rows': len(df), 'columns': columns}
+
+
+def _json_number(value):
+    # min and max of an empty column are NaN; JSON has no infinities either
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+
+    return value
+
+
+def categorize_columns(df):
+    """
+    Store the label columns of the distribution `df` (see
+    `CATEGORICAL_COLUMNS`) as categoricals, so each distinct label is held
+    once and grouping works on integer codes. Only object columns are
+    converted; numeric labels are already compact, and a table without rows
+    has no labels to compact. Column attrs are not carried over, so this
+    should run before they are set.
+    """
+    if len(df) == 0:
+        return df
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = df[col].astype('category')
+
+    return df
+
+
+def n_workers(n_jobs, n_tasks):
+    """
+    Number of worker processes to use for `n_tasks` tasks when `n_jobs`
+    were requested, where 'auto' or 0 means one per CPU.
+    """
+    if n_jobs in ('auto', 0):
+        n_jobs = os.cpu_count() or 1
+
+    return max(1, min(n_jobs, n_tasks))